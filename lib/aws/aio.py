@@ -0,0 +1,347 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.aws import cognito, dynamodb, s3
+from shared.config import config
+from shared.logging import getLogger
+from shared.utils import create_dir_if_not_exist
+from shared.utils.sanitize import sanitize_filename, sanitize_folder_path
+
+log = getLogger(__name__)
+
+# asyncio versions of the S3, DynamoDB & Cognito helpers, mirroring the names of the blocking versions.
+# These are executor-backed wrappers, not native async I/O: boto3 itself is blocking, so each request still holds
+# a thread of a dedicated pool (sized to the clients' connection pool, `AWS_MAX_POOL_CONNECTIONS`) while it runs.
+# They let async code await boto3 without blocking the event loop - the concurrency of each call is bounded with a
+# semaphore - but they don't remove the thread per in-flight request, which would need an async client.
+_executor = None
+_DONE = object()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config.aws.max_pool_connections, thread_name_prefix="aws-aio"
+        )
+    return _executor
+
+
+async def _run(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def _iter_pages(paginator, **params):
+    pages = iter(paginator.paginate(**params))
+    while True:
+        page = await _run(next, pages, _DONE)
+        if page is _DONE:
+            return
+        yield page
+
+
+async def _bounded(semaphore: asyncio.Semaphore, fn, *args, **kwargs):
+    async with semaphore:
+        return await _run(fn, *args, **kwargs)
+
+
+# ---------------------------------------------------
+#  S3
+async def list_s3_buckets(s3_client=None):
+    return await _run(s3.list_s3_buckets, s3_client)
+
+
+async def iter_files_in_bucket(
+    bucket_id: str,
+    handle_file_meta=s3._handle_file_meta,
+    s3_client=None,
+    prefix: str = "",
+    delimiter: str = "",
+    max_concurrency: int = 16,
+):
+    client = s3.init_s3_client(s3_client)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    paginator = client.get_paginator("list_objects_v2")
+
+    async for page in _iter_pages(
+        paginator, Bucket=bucket_id, Prefix=prefix, Delimiter=delimiter
+    ):
+        tasks = [
+            _bounded(
+                semaphore, s3._add_file_meta, client, bucket_id, f, handle_file_meta
+            )
+            for f in page.get("Contents", [])
+            if f["Size"] > 0
+        ]
+        for task in asyncio.as_completed(tasks):
+            yield await task
+
+
+async def list_files_in_bucket(
+    bucket_id: str,
+    handle_file_meta=s3._handle_file_meta,
+    s3_client=None,
+    prefix: str = "",
+    delimiter: str = "",
+    max_concurrency: int = 16,
+):
+    s3_files = [
+        f
+        async for f in iter_files_in_bucket(
+            bucket_id, handle_file_meta, s3_client, prefix, delimiter, max_concurrency
+        )
+    ]
+
+    log.success("FETCHED LIST OF FILES FROM S3")
+    return s3_files
+
+
+async def download_files_from_bucket(
+    files: list[dict],
+    bucket_id: str,
+    data_folder: str = None,
+    get_nested_folder_path=s3._get_nested_subfolders,
+    s3_client=None,
+    max_concurrency: int = 8,
+    transfer_config=None,
+    max_inflight_bytes: int = 512 * 1024 * 1024,
+    max_retries: int = 3,
+    use_cache: bool = None,
+):
+    """
+    Async version of `s3.download_files_from_bucket` - at most `max_concurrency` files (& `max_inflight_bytes`) are
+    downloaded at the same time, and a download task is only created once there's room for it.
+    """
+    client = s3.init_s3_client(s3_client)
+    data_folder = data_folder or config.paths.raw
+    transfer_config = transfer_config or s3.get_default_transfer_config()
+    cache = s3._get_cache(use_cache)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    budget = s3._ByteBudget(max_inflight_bytes)
+
+    async def _download(file: dict, _dir: str):
+        _meta = file["meta"]
+        try:
+            _sanitized_dir = create_dir_if_not_exist(sanitize_folder_path(_dir))
+            _sanitized_filename = sanitize_filename(_meta["filename"])
+            _meta["download_seconds"] = await _run(
+                s3._download_file,
+                client,
+                bucket_id,
+                file,
+                f"{_sanitized_dir}\\{_sanitized_filename}",
+                transfer_config,
+                max_retries,
+                cache,
+            )
+            _meta["location"] = _sanitized_dir
+            log.success(f'Downloaded - {_sanitized_dir}\\{_meta["filename"]}')
+        except Exception as e:
+            log.error(f'Download failed - {_dir}\\{_meta["filename"]} - {e}')
+        finally:
+            budget.release(file["Size"])
+            semaphore.release()
+
+    tasks = []
+    try:
+        for file in files:
+            _meta = file["meta"]
+            _dir = get_nested_folder_path(data_folder, _meta)
+            # Check if the file is currently accessible (hasn't been archived)
+            if file["StorageClass"] in ("GLACIER", "DEEP_ARCHIVE"):
+                log.warning(
+                    f'File in long term storage & cannot be retrieved - {_dir}\\{_meta["filename"]}'
+                )
+                continue
+
+            await semaphore.acquire()
+            try:
+                # waits on the pool (this is the only task that does), rather than blocking the event loop
+                await _run(budget.acquire, file["Size"])
+            except BaseException:
+                semaphore.release()
+                raise
+            tasks.append(asyncio.create_task(_download(file, _dir)))
+            tasks = [t for t in tasks if not t.done()]
+    finally:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    log.success("ALL FILES DOWNLOADED")
+    return files
+
+
+async def read_s3_object(
+    bucket_id: str,
+    key: str,
+    s3_client=None,
+    byte_range: tuple[int, int] = None,
+    part_size: int = 8 * 1024 * 1024,
+    max_workers: int = 8,
+    use_cache: bool = None,
+):
+    return await _run(
+        s3.read_s3_object,
+        bucket_id,
+        key,
+        s3_client,
+        byte_range,
+        part_size,
+        max_workers,
+        use_cache,
+    )
+
+
+# ---------------------------------------------------
+#  DynamoDB
+async def list_dynamodb_tables(dynamodb_client=None):
+    return await _run(dynamodb.list_dynamodb_tables, dynamodb_client)
+
+
+async def describe_dynamodb_table(table_name: str, dynamodb_client=None):
+    return await _run(dynamodb.describe_dynamodb_table, table_name, dynamodb_client)
+
+
+async def iter_dynamodb_table_pages(
+    table_name: str,
+    query: str = "",
+    dynamodb_client=None,
+    total_segments: int = 1,
+    max_buffered_pages: int = 8,
+    index_name: str = None,
+    projection_expression: str = None,
+    filter_expression: str = None,
+    expression_attribute_names: dict = None,
+    expression_attribute_values: dict = None,
+    schema: dict = None,
+    use_decimal: bool = True,
+):
+    """
+    Async version of `dynamodb.iter_dynamodb_table_pages` - each scan segment is fetched by its own task, which
+    waits once `max_buffered_pages` pages are waiting to be consumed.
+    """
+    client = dynamodb.init_dynamodb_client(dynamodb_client)
+    params = dynamodb._build_request_params(
+        table_name,
+        query,
+        index_name,
+        projection_expression,
+        filter_expression,
+        expression_attribute_names,
+        expression_attribute_values,
+    )
+    deserialize_item = dynamodb.compile_deserializer(schema, use_decimal)
+
+    if query:
+        async for page in _iter_pages(client.get_paginator("query"), **params):
+            yield dynamodb._deserialize_page(page, deserialize_item)
+        return
+
+    if total_segments > 1:
+        params["TotalSegments"] = total_segments
+        segment_params = [params | {"Segment": i} for i in range(total_segments)]
+    else:
+        segment_params = [params]
+
+    buffer = asyncio.Queue(maxsize=max_buffered_pages)
+
+    async def _scan_segment(_params: dict):
+        # a cancelled task (the consumer has gone away) doesn't put anything on the buffer, as nothing would ever
+        # take it off again - `CancelledError` isn't an `Exception`
+        try:
+            async for page in _iter_pages(client.get_paginator("scan"), **_params):
+                await buffer.put(dynamodb._deserialize_page(page, deserialize_item))
+        except Exception as e:
+            await buffer.put(e)
+        await buffer.put(_DONE)
+
+    tasks = [asyncio.create_task(_scan_segment(p)) for p in segment_params]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            page = await buffer.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iter_dynamodb_table_data(
+    table_name: str, query: str = "", dynamodb_client=None, **kwargs
+):
+    async for page in iter_dynamodb_table_pages(
+        table_name, query, dynamodb_client, **kwargs
+    ):
+        for item in page:
+            yield item
+
+
+async def get_dynamodb_table_data(
+    table_name: str, query: str = "", dynamodb_client=None, **kwargs
+):
+    data = [
+        item
+        async for item in iter_dynamodb_table_data(
+            table_name, query, dynamodb_client, **kwargs
+        )
+    ]
+
+    log.success(f"Scanned {len(data)} items")
+    return data
+
+
+# ---------------------------------------------------
+#  Cognito
+async def list_user_pools(cognito_client=None):
+    return await _run(cognito.list_user_pools, cognito_client)
+
+
+async def iter_users(
+    user_pool_id: str,
+    cognito_client=None,
+    filter: str = None,
+    attributes: list[str] = None,
+):
+    client = cognito.init_cognito_client(cognito_client)
+    params = {"UserPoolId": user_pool_id, "PaginationConfig": {"PageSize": 60}}
+    if filter:
+        params["Filter"] = filter
+    if attributes is not None:
+        params["AttributesToGet"] = attributes
+
+    async for page in _iter_pages(client.get_paginator("list_users"), **params):
+        for user in page["Users"]:
+            yield user
+
+
+async def list_users(
+    user_pool_id: str,
+    cognito_client=None,
+    filter: str = None,
+    attributes: list[str] = None,
+    cache_ttl: float = None,
+):
+    return await _run(
+        cognito.list_users, user_pool_id, cognito_client, filter, attributes, cache_ttl
+    )
+
+
+async def create_user(user: cognito.User, user_pool_id: str, cognito_client=None):
+    return await _run(cognito.create_user, user, user_pool_id, cognito_client)
+
+
+async def edit_user(user: cognito.User, user_pool_id: str, cognito_client=None):
+    return await _run(cognito.edit_user, user, user_pool_id, cognito_client)
+
+
+async def resend_invite(email: str, user_pool_id: str, cognito_client=None):
+    return await _run(cognito.resend_invite, email, user_pool_id, cognito_client)
@@ -0,0 +1,75 @@
+"""
+Helpers for the `lib/aws` benchmarks. They run against a local stand-in for AWS - moto's in-process mock by
+default, or any server given by `--endpoint-url` (e.g. `moto_server`, DynamoDB Local or MinIO) - with `--latency`
+added to every request to stand in for the round trip to AWS.
+"""
+import argparse
+import contextlib
+import time
+
+REGION = "eu-west-1"
+
+
+def add_stand_in_arguments(parser: argparse.ArgumentParser, latency: float = 10):
+    parser.add_argument(
+        "--endpoint-url",
+        help="URL of a local AWS stand-in (defaults to moto's in-process mock)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=latency,
+        help="Milliseconds added to every request",
+    )
+
+
+@contextlib.contextmanager
+def stand_in(endpoint_url: str = None):
+    if endpoint_url is not None:
+        yield
+        return
+
+    from moto import mock_aws
+
+    with mock_aws():
+        yield
+
+
+def get_stand_in_client(
+    service: str,
+    endpoint_url: str = None,
+    latency: float = 0,
+    max_pool_connections: int = 50,
+):
+    """
+    Get a boto3 client for the stand-in - not `lib.aws.client.get_client`, so the benchmarks don't share clients
+    (or their latency) with each other.
+
+    :param service: Name of the AWS service, e.g. `s3`
+    :param endpoint_url: URL of the stand-in (defaults to moto's in-process mock)
+    :param latency: Milliseconds added to every request (the thread sleeps, like it would waiting on the network)
+    :param max_pool_connections: Max number of connections kept open
+    :return: boto3 client
+    """
+    import boto3
+    from botocore.config import Config
+
+    client = boto3.client(
+        service,
+        region_name=REGION,
+        endpoint_url=endpoint_url,
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+        config=Config(max_pool_connections=max_pool_connections),
+    )
+    if latency:
+        client.meta.events.register(
+            "before-call", lambda **_: time.sleep(latency / 1000)
+        )
+    return client
+
+
+def log_result(log, method: str, count: int, seconds: float, unit: str = "items"):
+    log.info(
+        f"{method:<26} :: {count} {unit} in {seconds:.3f}s ({count / seconds:,.0f} {unit}/s)"
+    )
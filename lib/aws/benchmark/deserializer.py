@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of `compile_deserializer` against deserializing each attribute with `TypeDeserializer`, e.g.
+
+    python -m lib.aws.benchmark.deserializer
+    python -m lib.aws.benchmark.deserializer --items 100000 --repeat 5
+
+The items are deserialized in memory (no stand-in is needed) & the best of `--repeat` runs is logged. The output
+of `compile_deserializer` is checked against `TypeDeserializer`'s first.
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from lib.aws.benchmark import log_result
+from lib.aws.dynamodb import compile_deserializer
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+SCHEMA = {"pk": "S", "count": "N", "value": "N", "name": "S"}
+
+
+def _create_items(items: int) -> list[dict]:
+    from boto3.dynamodb.types import TypeSerializer
+
+    type_serializer = TypeSerializer()
+    return [
+        {
+            k: type_serializer.serialize(v)
+            for k, v in {
+                "pk": f"item-{i}",
+                "count": i,
+                "value": Decimal(i) / 8,
+                "active": i % 2 == 0,
+                "name": f"name {i}",
+                "missing": None,
+                "tags": [f"tag-{i % 5}", i % 7],
+                "details": {"group": i % 10, "label": f"label {i % 3}"},
+            }.items()
+        }
+        for i in range(items)
+    ]
+
+
+def _get_type_deserializer():
+    from boto3.dynamodb.types import TypeDeserializer
+
+    type_deserializer = TypeDeserializer()
+    return lambda item: {k: type_deserializer.deserialize(v) for k, v in item.items()}
+
+
+METHODS = {
+    "TypeDeserializer": _get_type_deserializer,
+    "compiled": lambda: compile_deserializer(),
+    "compiled (schema)": lambda: compile_deserializer(SCHEMA),
+    "compiled (floats)": lambda: compile_deserializer(use_decimal=False),
+    "compiled (schema, floats)": lambda: compile_deserializer(SCHEMA, False),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--items", type=int, default=50_000, help="Number of items to deserialize"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each method")
+    args = parser.parse_args()
+
+    items = _create_items(args.items)
+    expected = [METHODS["TypeDeserializer"]()(item) for item in items]
+    for method in ("compiled", "compiled (schema)"):
+        deserialize_item = METHODS[method]()
+        if [deserialize_item(item) for item in items] != expected:
+            raise AssertionError(f"`{method}` doesn't match `TypeDeserializer`")
+
+    log.info(f"Benchmarking {args.items} items (best of {args.repeat})")
+    for method, get_deserializer in METHODS.items():
+        deserialize_item = get_deserializer()
+        seconds = float("inf")
+        for _ in range(args.repeat):
+            _start = time.perf_counter()
+            for item in items:
+                deserialize_item(item)
+            seconds = min(seconds, time.perf_counter() - _start)
+        log_result(log, method, args.items, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark of scanning a table with `iter_dynamodb_table_data` (streamed, in parallel segments) against the
+single-segment scan it replaced, which deserialized the whole table into one list, e.g.
+
+    python -m lib.aws.benchmark.dynamodb
+    python -m lib.aws.benchmark.dynamodb --items 100000 --segments 8 --memory
+    python -m lib.aws.benchmark.dynamodb --endpoint-url http://localhost:8000  # DynamoDB Local
+
+See `lib.aws.benchmark` for the DynamoDB stand-in. With `--memory`, each method is run again under `tracemalloc`
+to get its peak memory. moto's in-process mock builds every page in this process (& under its GIL), which hides
+the gains of parallel segments & adds to the peak memory - use a server (e.g. DynamoDB Local) for both.
+"""
+import argparse
+import time
+from decimal import Decimal
+import tracemalloc
+
+from lib.aws.benchmark import (
+    add_stand_in_arguments,
+    get_stand_in_client,
+    log_result,
+    stand_in,
+)
+from lib.aws.dynamodb import batch_write, iter_dynamodb_table_data
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+TABLE = "benchmark"
+
+
+def _scan_old(client, table_name: str, segments: int):
+    # the scan `iter_dynamodb_table_data` replaced
+    from boto3.dynamodb.types import TypeDeserializer
+
+    paginator = client.get_paginator("scan")
+    type_deserializer = TypeDeserializer()
+    data = []
+    for page in paginator.paginate(TableName=table_name):
+        for item in page["Items"]:
+            data.append({k: type_deserializer.deserialize(v) for k, v in item.items()})
+    return len(data)
+
+
+def _iter(client, table_name: str, segments: int):
+    items = iter_dynamodb_table_data(table_name, dynamodb=client)
+    return sum(1 for _ in items)
+
+
+def _iter_segments(client, table_name: str, segments: int, use_decimal=True):
+    items = iter_dynamodb_table_data(
+        table_name,
+        dynamodb=client,
+        total_segments=segments,
+        use_decimal=use_decimal,
+    )
+    return sum(1 for _ in items)
+
+
+def _iter_segments_floats(client, table_name: str, segments: int):
+    return _iter_segments(client, table_name, segments, use_decimal=False)
+
+
+METHODS = {
+    "old scan": _scan_old,
+    "iter (1 segment)": _iter,
+    "iter (segments)": _iter_segments,
+    "iter (segments, floats)": _iter_segments_floats,
+}
+
+
+def _create_table(client, items: int):
+    client.create_table(
+        TableName=TABLE,
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    # ~1KB per item, so the table spans ~1 page (of 1MB) per 1,000 items
+    result = batch_write(
+        TABLE,
+        [
+            {
+                "pk": f"item-{i}",
+                "count": i,
+                "value": Decimal(i) / 8,
+                "active": i % 2 == 0,
+                "name": f"name {i}" * 80,
+                "tags": [f"tag-{i % 5}", f"tag-{i % 7}"],
+                "details": {"group": i % 10, "label": f"label {i % 3}"},
+            }
+            for i in range(items)
+        ],
+        dynamodb_client=client,
+    )
+    if result["unprocessed"]:
+        raise RuntimeError(f"Failed to fill the table: {result['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--items", type=int, default=5000, help="Number of items in the table"
+    )
+    parser.add_argument(
+        "--segments", type=int, default=4, help="Number of parallel scan segments"
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Also measure the peak memory of each method",
+    )
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+
+    with stand_in(args.endpoint_url):
+        _create_table(get_stand_in_client("dynamodb", args.endpoint_url), args.items)
+        client = get_stand_in_client("dynamodb", args.endpoint_url, args.latency)
+        log.info(
+            f"Benchmarking a table of {args.items} items ({args.segments} segments, {args.latency:g}ms latency)"
+        )
+        for method, fn in METHODS.items():
+            _start = time.perf_counter()
+            count = fn(client, TABLE, args.segments)
+            log_result(log, method, count, time.perf_counter() - _start)
+
+        if args.memory:
+            for method, fn in METHODS.items():
+                tracemalloc.start()
+                try:
+                    fn(client, TABLE, args.segments)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                log.info(f"{method:<26} :: peak memory {peak / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
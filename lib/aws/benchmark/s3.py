@@ -0,0 +1,97 @@
+"""
+Benchmark of listing a bucket with `iter_files_in_bucket` against the serial `head_object` lister it replaced, e.g.
+
+    python -m lib.aws.benchmark.s3
+    python -m lib.aws.benchmark.s3 --files 5000 --latency 20
+    python -m lib.aws.benchmark.s3 --endpoint-url http://localhost:5000
+
+See `lib.aws.benchmark` for the S3 stand-in.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.aws.benchmark import (
+    REGION,
+    add_stand_in_arguments,
+    get_stand_in_client,
+    log_result,
+    stand_in,
+)
+from lib.aws.s3 import _handle_file_meta, _iter_objects_in_bucket, iter_files_in_bucket
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+BUCKET = "benchmark"
+
+
+def _list_files_serial(client, bucket_id: str, max_workers: int):
+    # the lister `iter_files_in_bucket` replaced - though it follows continuation tokens here, where it stopped
+    # after the first 1,000 keys
+    s3_files = []
+    for f in _iter_objects_in_bucket(client, bucket_id):
+        _meta = client.head_object(Bucket=bucket_id, Key=f["Key"])["Metadata"]
+        f["meta"] = _handle_file_meta(f["Key"], _meta)
+        s3_files.append(f)
+    return len(s3_files)
+
+
+def _iter_files(client, bucket_id: str, max_workers: int):
+    files = iter_files_in_bucket(bucket_id, s3_client=client, max_workers=max_workers)
+    return sum(1 for _ in files)
+
+
+METHODS = {
+    "serial head_object": _list_files_serial,
+    "iter_files_in_bucket": _iter_files,
+}
+
+
+def _create_bucket(client, files: int):
+    client.create_bucket(
+        Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": REGION}
+    )
+
+    def _put(i: int):
+        client.put_object(
+            Bucket=BUCKET,
+            Key=f"folder-{i % 10}/file-{i}.txt",
+            Body=f"content {i}".encode(),
+            Metadata={"uploader": f"user-{i % 100}"},
+        )
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(_put, range(files)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--files", type=int, default=2000, help="Number of files in the bucket"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=16,
+        help="Max concurrent `head_object` requests of `iter_files_in_bucket`",
+    )
+    add_stand_in_arguments(parser)
+    args = parser.parse_args()
+
+    with stand_in(args.endpoint_url):
+        _create_bucket(get_stand_in_client("s3", args.endpoint_url), args.files)
+        client = get_stand_in_client(
+            "s3", args.endpoint_url, args.latency, max(args.max_workers, 10)
+        )
+        log.info(
+            f"Benchmarking a bucket of {args.files} files ({args.latency:g}ms latency)"
+        )
+        for method, fn in METHODS.items():
+            _start = time.perf_counter()
+            count = fn(client, BUCKET, args.max_workers)
+            log_result(log, method, count, time.perf_counter() - _start, "files")
+
+
+if __name__ == "__main__":
+    main()
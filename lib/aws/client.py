@@ -0,0 +1,123 @@
+import threading
+
+from shared.config import config
+
+_clients = {}
+_clients_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_session(
+    aws_access_key_id: str = None,
+    aws_secret_access_key: str = None,
+    aws_session_token: str = None,
+    region_name: str = None,
+):
+    # boto3 sessions aren't thread-safe, so each thread gets its own (cached) session per set of credentials
+    if not hasattr(_local, "sessions"):
+        _local.sessions = {}
+
+    key = (aws_access_key_id, aws_secret_access_key, aws_session_token, region_name)
+    if key not in _local.sessions:
+        # boto3 is slow to import, so it's only imported once a client is actually needed
+        import boto3
+
+        _local.sessions[key] = boto3.session.Session(
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            aws_session_token=aws_session_token,
+            region_name=region_name,
+        )
+    return _local.sessions[key]
+
+
+def get_client(
+    service: str,
+    region_name: str = None,
+    aws_access_key_id: str = None,
+    aws_secret_access_key: str = None,
+    aws_session_token: str = None,
+    max_pool_connections: int = None,
+    retry_mode: str = None,
+    max_attempts: int = None,
+):
+    """
+    Get a boto3 client, reusing an existing client (and its connection pool) for the same service, region,
+    credentials & connection settings. Clients are thread-safe, so one client is shared between all threads.
+
+    Any arguments that aren't passed default to the values in `config.aws`.
+
+    :param service: Name of the AWS service, e.g. `s3`
+    :param region_name: AWS region
+    :param aws_access_key_id: AWS access key id
+    :param aws_secret_access_key: AWS secret access key
+    :param aws_session_token: AWS session token
+    :param max_pool_connections: Max number of connections kept open (should be >= the number of worker threads)
+    :param retry_mode: botocore retry mode - `legacy`, `standard` or `adaptive`
+    :param max_attempts: Max number of attempts per request (including the first)
+    :return: boto3 client
+    """
+    key = (
+        service,
+        region_name or config.aws.region,
+        aws_access_key_id or config.aws.access_key_id,
+        aws_secret_access_key or config.aws.secret_access_key,
+        aws_session_token or config.aws.session_token,
+        max_pool_connections or config.aws.max_pool_connections,
+        retry_mode or config.aws.retry_mode,
+        max_attempts or config.aws.max_attempts,
+    )
+
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _create_client(*key)
+                _clients[key] = client
+    return client
+
+
+def _create_client(
+    service: str,
+    region_name: str,
+    aws_access_key_id: str,
+    aws_secret_access_key: str,
+    aws_session_token: str,
+    max_pool_connections: int,
+    retry_mode: str,
+    max_attempts: int,
+):
+    from botocore.config import Config
+
+    session = get_session(
+        aws_access_key_id, aws_secret_access_key, aws_session_token, region_name
+    )
+    return session.client(
+        service,
+        config=Config(
+            max_pool_connections=max_pool_connections,
+            retries={"mode": retry_mode, "max_attempts": max_attempts},
+        ),
+    )
+
+
+def clear_clients():
+    with _clients_lock:
+        _clients.clear()
+
+
+def get_client_key(client) -> tuple:
+    """
+    Identify the account & region a client talks to, for keying cached results - so clients for different
+    accounts or regions never share them. Only built from public attributes (& the config), so stubbed or wrapped
+    clients work too.
+
+    :return: Tuple of the client's region & endpoint, and the configured access key id or profile
+    """
+    meta = getattr(client, "meta", None)
+    return (
+        getattr(meta, "region_name", None),
+        getattr(meta, "endpoint_url", None),
+        config.aws.access_key_id or config.aws.profile,
+    )
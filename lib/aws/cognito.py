@@ -1,30 +1,38 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict
 
-import boto3
-
-from shared.config import config
+from lib.aws.client import get_client, get_client_key
+from shared import metrics
+from shared.logging import getLogger
 from shared.utils import get_attr
 
+log = getLogger(__name__)
+
 
 def init_cognito_client(cognito_client=None):
     if cognito_client is None:
-        return boto3.client(
-            "cognito-idp",
-            aws_access_key_id=config.aws.access_key_id,
-            aws_secret_access_key=config.aws.secret_access_key,
-            aws_session_token=config.aws.session_token,
-        )
+        return get_client("cognito-idp")
     else:
         return cognito_client
 
 
 # %%  List user pools in account (useful to get pool id)
-def list_user_pools(cognito_client=None):
+def iter_user_pools(cognito_client=None):
     client = init_cognito_client(cognito_client)
-    return client.list_user_pools(
-        # NextToken='string',
-        MaxResults=10
-    )
+    paginator = client.get_paginator("list_user_pools")
+    for page in paginator.paginate(MaxResults=60):
+        yield from page["UserPools"]
+
+
+def list_user_pools(cognito_client=None):
+    """
+    List all the user pools in the account - in the shape of a `list_user_pools` response (`{"UserPools": [...]}`),
+    but with every page. Use `iter_user_pools` to stream them.
+    """
+    return {"UserPools": list(iter_user_pools(cognito_client))}
 
 
 # %%  User Management functions
@@ -35,12 +43,77 @@ class User(TypedDict):
     org: str
 
 
-def list_users(user_pool_id: str, cognito_client=None):
+def iter_users(
+    user_pool_id: str,
+    cognito_client=None,
+    filter: str = None,
+    attributes: list[str] = None,
+):
+    """
+    Stream all the users in a pool, following the `PaginationToken` of each page.
+
+    :param user_pool_id: Id of the user pool
+    :param cognito_client: Optional existing boto3 Cognito client
+    :param filter: Optional Cognito filter string, e.g. `email ^= "bob"` or `status = "Enabled"`
+    :param attributes: Optional list of the user attributes to return (defaults to all)
+    :return: Generator of users
+    """
     client = init_cognito_client(cognito_client)
-    return client.list_users(
-        UserPoolId=user_pool_id,
-        Limit=50,
-    )
+    params = {"UserPoolId": user_pool_id, "PaginationConfig": {"PageSize": 60}}
+    if filter:
+        params["Filter"] = filter
+    if attributes is not None:
+        params["AttributesToGet"] = attributes
+
+    paginator = client.get_paginator("list_users")
+    for page in paginator.paginate(**params):
+        yield from page["Users"]
+
+
+_users_cache = {}
+_users_cache_lock = threading.Lock()
+
+
+@metrics.timed()
+def list_users(
+    user_pool_id: str,
+    cognito_client=None,
+    filter: str = None,
+    attributes: list[str] = None,
+    cache_ttl: float = None,
+):
+    """
+    List all the users in a pool - in the shape of a `list_users` response (`{"Users": [...]}`), but with every
+    page. Use `iter_users` to stream them. If a `cache_ttl` (in seconds) is given, the listing is kept in memory &
+    reused until it is older than the TTL.
+    """
+    client = init_cognito_client(cognito_client)
+    if cache_ttl is not None:
+        key = (
+            get_client_key(client),
+            user_pool_id,
+            filter,
+            tuple(attributes) if attributes else attributes,
+        )
+        with _users_cache_lock:
+            cached = _users_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+            # a copy, so a caller changing the list doesn't change what later calls get
+            return {"Users": list(cached[1])}
+
+    users = list(iter_users(user_pool_id, client, filter, attributes))
+    log.debug(f"Listed {len(users)} users - {user_pool_id}")
+
+    if cache_ttl is not None:
+        with _users_cache_lock:
+            _users_cache[key] = (time.monotonic(), users)
+        return {"Users": list(users)}
+    return {"Users": users}
+
+
+def clear_users_cache():
+    with _users_cache_lock:
+        _users_cache.clear()
 
 
 def create_user(user: User, user_pool_id: str, cognito_client=None):
@@ -85,3 +158,118 @@ def resend_invite(email: str, user_pool_id: str, cognito_client=None):
     )
 
     return res
+
+
+# %%  Bulk user management functions
+class TUserResult(TypedDict):
+    username: str
+    success: bool
+    response: dict
+    error: str
+
+
+class _RateLimiter:
+    """
+    Thread-safe limiter that spaces out calls to at most `max_tps` per second (Cognito's admin APIs have low
+    per-account quotas).
+    """
+
+    def __init__(self, max_tps: float):
+        self.interval = 1 / max_tps
+        self._next_call = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def _run_bulk(
+    action, users: list[User], max_workers: int, max_tps: float, max_retries: int
+) -> list[TUserResult]:
+    from botocore.exceptions import ClientError
+
+    limiter = _RateLimiter(max_tps)
+
+    def _run(user: User) -> TUserResult:
+        username = get_attr(user, "email")
+        for attempt in range(max_retries + 1):
+            limiter.wait()
+            metrics.increment("cognito.requests")
+            try:
+                return TUserResult(
+                    username=username, success=True, response=action(user), error=""
+                )
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                if code == "TooManyRequestsException" and attempt < max_retries:
+                    metrics.increment("cognito.throttles")
+                    log.warning(f"Throttled, retrying - {username}")
+                    time.sleep(random.uniform(0, min(20, 0.5 * 2**attempt)))
+                    continue
+                return TUserResult(
+                    username=username, success=False, response={}, error=str(e)
+                )
+            except Exception as e:
+                # e.g. a `ParamValidationError` for a user without an email - it only fails that user
+                return TUserResult(
+                    username=username, success=False, response={}, error=repr(e)
+                )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_run, users))
+
+    _failed = [r for r in results if not r["success"]]
+    if _failed:
+        log.error(f"{len(_failed)}/{len(results)} users failed")
+    else:
+        log.success(f"{len(results)} users processed")
+    return results
+
+
+def create_users(
+    users: list[User],
+    user_pool_id: str,
+    cognito_client=None,
+    max_workers: int = 4,
+    max_tps: float = 10,
+    max_retries: int = 5,
+) -> list[TUserResult]:
+    """
+    Create many users concurrently, throttled to `max_tps` requests per second. A failed user doesn't stop the
+    batch - check the `success`/`error` of each result instead.
+    """
+    client = init_cognito_client(cognito_client)
+    return _run_bulk(
+        lambda user: create_user(user, user_pool_id, client),
+        users,
+        max_workers,
+        max_tps,
+        max_retries,
+    )
+
+
+def edit_users(
+    users: list[User],
+    user_pool_id: str,
+    cognito_client=None,
+    max_workers: int = 4,
+    max_tps: float = 10,
+    max_retries: int = 5,
+) -> list[TUserResult]:
+    """
+    Update the attributes of many users concurrently, throttled to `max_tps` requests per second. A failed user
+    doesn't stop the batch - check the `success`/`error` of each result instead.
+    """
+    client = init_cognito_client(cognito_client)
+    return _run_bulk(
+        lambda user: edit_user(user, user_pool_id, client),
+        users,
+        max_workers,
+        max_tps,
+        max_retries,
+    )
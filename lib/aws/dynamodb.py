@@ -1,20 +1,27 @@
-import boto3
-from boto3.dynamodb.types import TypeDeserializer
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import TypedDict
 
+from lib.aws.client import get_client, get_client_key
+from shared import metrics
 from shared.config import config
 from shared.logging import getLogger
+from shared.utils import create_dir_if_not_exist
+from shared.utils.sanitize import sanitize_filename
 
 log = getLogger(__name__)
 
 
 def init_dynamodb_client(dynamodb_client=None):
     if dynamodb_client is None:
-        return boto3.client(
-            "dynamodb",
-            aws_access_key_id=config.aws.access_key_id,
-            aws_secret_access_key=config.aws.secret_access_key,
-            aws_session_token=config.aws.session_token,
-        )
+        return get_client("dynamodb")
     else:
         return dynamodb_client
 
@@ -26,27 +33,943 @@ def list_dynamodb_tables(dynamodb_client=None):
     return res["TableNames"]
 
 
-def describe_dynamodb_table(table_name: str, dynamodb_client=None):
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _get_cached(key: tuple, cache_ttl: float):
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+        return cached[1]
+    return None
+
+
+def _set_cached(key: tuple, value, age: float = 0):
+    with _cache_lock:
+        _cache[key] = (time.monotonic() - age, value)
+
+
+def clear_dynamodb_cache():
+    """
+    Clear the in-memory cache of table descriptions & data. The on-disk cache of table frames is kept, but it is
+    no longer used to refresh incrementally - see `get_dynamodb_table_frame`.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+
+def describe_dynamodb_table(
+    table_name: str, dynamodb_client=None, cache_ttl: float = None
+):
+    """
+    Describe a table. If a `cache_ttl` (in seconds) is given, the description is kept in memory & reused until it
+    is older than the TTL.
+    """
     client = init_dynamodb_client(dynamodb_client)
+    if cache_ttl is not None:
+        key = ("describe", get_client_key(client), table_name)
+        cached = _get_cached(key, cache_ttl)
+        if cached is not None:
+            return cached
+
     res = client.describe_table(TableName=table_name)
+
+    if cache_ttl is not None:
+        _set_cached(key, res["Table"])
     return res["Table"]
 
 
+def get_dynamodb_table_schema(
+    table_name: str, dynamodb_client=None, cache_ttl: float = None
+):
+    table = describe_dynamodb_table(table_name, dynamodb_client, cache_ttl)
+    return {
+        a["AttributeName"]: a["AttributeType"] for a in table["AttributeDefinitions"]
+    }
+
+
+# ---------------------------------------------------
+#  Deserialization
+def _to_number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _get_kind(value):
+    if isinstance(value, bool):
+        return bool
+    if isinstance(value, (int, float, Decimal)):
+        return "number"
+    return type(value)
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _to_uniform_list(values: list):
+    # a Polars list holds a single type, so a list of mixed types (e.g. `[1, "a"]`) is stored as text
+    if len({_get_kind(v) for v in values if v is not None}) > 1:
+        return [_to_text(v) for v in values]
+    return values
+
+
+def _make_value_deserializer(use_decimal: bool = True, for_frame: bool = False):
+    from boto3.dynamodb.types import DYNAMODB_CONTEXT, Binary
+
+    to_number = DYNAMODB_CONTEXT.create_decimal if use_decimal else _to_number
+
+    def deserialize(value: dict):
+        # each attribute value is a single-key dict, e.g. `{"S": "abc"}`
+        for type_code, v in value.items():
+            # strings are by far the most common type, so skip the lookup for them
+            if type_code == "S":
+                return v
+            try:
+                convert = converters[type_code]
+            except KeyError:
+                raise TypeError(f"Dynamodb type {type_code} is not supported")
+            return convert(v)
+
+    converters = {
+        "N": to_number,
+        "BOOL": lambda v: v,
+        "NULL": lambda v: None,
+        "M": lambda v: {k: deserialize(x) for k, x in v.items()},
+        "L": lambda v: [deserialize(x) for x in v],
+        "SS": set,
+        "NS": lambda v: set(map(to_number, v)),
+        "B": Binary,
+        "BS": lambda v: set(map(Binary, v)),
+    }
+    if for_frame:
+        # Polars would store sets & `Binary` values as `Object` columns, which can't be concatenated or written to
+        # Parquet/IPC - so sets become sorted lists & binary values `bytes`
+        converters |= {
+            "L": lambda v: _to_uniform_list([deserialize(x) for x in v]),
+            "SS": sorted,
+            "NS": lambda v: sorted(map(to_number, v)),
+            "B": bytes,
+            "BS": lambda v: sorted(map(bytes, v)),
+        }
+    return deserialize
+
+
+def compile_deserializer(
+    schema: dict = None, use_decimal: bool = True, for_frame: bool = False
+):
+    """
+    Build a function that deserializes a raw DynamoDB item into python values, giving the same output as
+    `TypeDeserializer` but without its per-attribute method dispatch.
+
+    :param schema: Optional mapping of attribute name -> type code (e.g. from `get_dynamodb_table_schema`), used to
+        skip the type lookup for those attributes
+    :param use_decimal: Return numbers as `Decimal` (exact, like `TypeDeserializer`) or as `int`/`float`
+    :param for_frame: Return values Polars can store instead - sets as sorted lists, binary values as `bytes` &
+        lists of mixed types as lists of text
+    :return: Function taking a raw item & returning a dict
+    """
+    from boto3.dynamodb.types import DYNAMODB_CONTEXT, Binary
+
+    deserialize = _make_value_deserializer(use_decimal, for_frame)
+    to_number = DYNAMODB_CONTEXT.create_decimal if use_decimal else _to_number
+
+    def _expect(type_code: str, convert):
+        # fall back to the generic path if an item doesn't match the schema
+        def _convert(value: dict):
+            v = value.get(type_code)
+            return deserialize(value) if v is None else convert(v)
+
+        return _convert
+
+    converters = {}
+    for name, type_code in (schema or {}).items():
+        if type_code == "S":
+            converters[name] = _expect("S", str)
+        elif type_code == "N":
+            converters[name] = _expect("N", to_number)
+        elif type_code == "B":
+            converters[name] = _expect("B", bytes if for_frame else Binary)
+
+    if not converters:
+        return lambda item: {k: deserialize(v) for k, v in item.items()}
+
+    def deserialize_item(item: dict):
+        return {k: converters.get(k, deserialize)(v) for k, v in item.items()}
+
+    return deserialize_item
+
+
 # ---------------------------------------------------
 #  DynamoDB Table Data
-def get_dynamodb_table_data(table_name: str, query="", dynamodb=None):
-    client = init_dynamodb_client(dynamodb)
+_DONE = object()
+
+
+def _build_request_params(
+    table_name: str,
+    query: str = "",
+    index_name: str = None,
+    projection_expression: str = None,
+    filter_expression: str = None,
+    expression_attribute_names: dict = None,
+    expression_attribute_values: dict = None,
+):
+    params = {"TableName": table_name}
+    if query:
+        params["KeyConditionExpression"] = query
+    if index_name:
+        params["IndexName"] = index_name
+    if projection_expression:
+        params["ProjectionExpression"] = projection_expression
+    if filter_expression:
+        params["FilterExpression"] = filter_expression
+    if expression_attribute_names:
+        params["ExpressionAttributeNames"] = expression_attribute_names
+    if expression_attribute_values:
+        # values are passed as plain python values & converted to the DynamoDB wire format here
+        from boto3.dynamodb.types import TypeSerializer
+
+        type_serializer = TypeSerializer()
+        params["ExpressionAttributeValues"] = {
+            k: type_serializer.serialize(v)
+            for k, v in expression_attribute_values.items()
+        }
+    return params
+
+
+def _deserialize_page(page: dict, deserialize_item):
+    metrics.increment("dynamodb.pages")
+    metrics.increment("dynamodb.items_scanned", page["ScannedCount"])
+    metrics.increment("dynamodb.items_returned", page["Count"])
+    return [deserialize_item(item) for item in page["Items"]]
+
+
+def _put_until_stopped(buffer: queue.Queue, value, stop: threading.Event):
+    # blocks while the buffer is full (backpressure), but gives up if the consumer has gone away
+    while not stop.is_set():
+        try:
+            buffer.put(value, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _scan_segment(
+    client,
+    params: dict,
+    deserialize_item,
+    buffer: queue.Queue,
+    stop: threading.Event,
+    segment=None,
+):
     paginator = client.get_paginator("scan")
-    page_iterator = paginator.paginate(TableName=table_name)
+    try:
+        _params = params if segment is None else params | {"Segment": segment}
+        for page in paginator.paginate(**_params):
+            log.debug(
+                f"Scanned page - segment {segment} - {page['Count']}/{page['ScannedCount']} items"
+            )
+            if not _put_until_stopped(
+                buffer, _deserialize_page(page, deserialize_item), stop
+            ):
+                return
+    except Exception as e:
+        _put_until_stopped(buffer, e, stop)
+    finally:
+        _put_until_stopped(buffer, _DONE, stop)
+
+
+def iter_dynamodb_table_pages(
+    table_name: str,
+    query: str = "",
+    dynamodb=None,
+    total_segments: int = 1,
+    max_workers: int = None,
+    max_buffered_pages: int = 8,
+    index_name: str = None,
+    projection_expression: str = None,
+    filter_expression: str = None,
+    expression_attribute_names: dict = None,
+    expression_attribute_values: dict = None,
+    schema: dict = None,
+    use_decimal: bool = True,
+    for_frame: bool = False,
+):
+    """
+    Stream the (deserialized) items of a table one page at a time, so memory is bounded by the page buffer rather
+    than the size of the table.
+
+    If a `query` (key condition expression) is given, the table is queried, otherwise it is scanned. Scans can be
+    split into `total_segments` parallel segments, which are fetched by a pool of worker threads. Workers pause
+    once `max_buffered_pages` pages are waiting to be consumed.
+
+    :param table_name: Name of the DynamoDB table
+    :param query: Key condition expression, e.g. `pk = :pk`
+    :param dynamodb: Optional existing boto3 DynamoDB client
+    :param total_segments: Number of parallel scan segments (ignored for queries)
+    :param max_workers: Max number of segments scanned at the same time (defaults to `total_segments`)
+    :param max_buffered_pages: Max number of fetched pages held in memory before the workers wait
+    :param index_name: Optional secondary index to scan/query
+    :param projection_expression: Optional attributes to return, e.g. `pk, #name`
+    :param filter_expression: Optional filter applied (server-side) after the scan/query
+    :param expression_attribute_names: Placeholder names used in the expressions, e.g. `{"#name": "name"}`
+    :param expression_attribute_values: Placeholder values used in the expressions, e.g. `{":pk": "abc"}`
+    :param schema: Optional mapping of attribute name -> type code, see `compile_deserializer`
+    :param use_decimal: Return numbers as `Decimal` or as `int`/`float`, see `compile_deserializer`
+    :param for_frame: Return values Polars can store, see `compile_deserializer`
+    :return: Generator of lists of items
+    """
+    client = init_dynamodb_client(dynamodb)
+    params = _build_request_params(
+        table_name,
+        query,
+        index_name,
+        projection_expression,
+        filter_expression,
+        expression_attribute_names,
+        expression_attribute_values,
+    )
+    deserialize_item = compile_deserializer(schema, use_decimal, for_frame)
+
+    if query:
+        paginator = client.get_paginator("query")
+        for page in paginator.paginate(**params):
+            log.debug(f"Queried page - {page['Count']}/{page['ScannedCount']} items")
+            yield _deserialize_page(page, deserialize_item)
+        return
+
+    if total_segments > 1:
+        params["TotalSegments"] = total_segments
+        segments = list(range(total_segments))
+    else:
+        segments = [None]
+
+    buffer = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(segments))
+    for segment in segments:
+        executor.submit(
+            _scan_segment, client, params, deserialize_item, buffer, stop, segment
+        )
 
-    type_deserializer = TypeDeserializer()
+    try:
+        remaining = len(segments)
+        while remaining:
+            page = buffer.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        # stop the workers if the consumer stopped early (or a segment failed)
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    data = []
-    for page in page_iterator:
-        log.info(f"Scanning page {page['ScannedCount']}/{page['Count']}")
-        for item in page["Items"]:
-            clean = {k: type_deserializer.deserialize(v) for k, v in item.items()}
-            data.append(clean)
 
+def iter_dynamodb_table_data(table_name: str, query: str = "", dynamodb=None, **kwargs):
+    for page in iter_dynamodb_table_pages(table_name, query, dynamodb, **kwargs):
+        yield from page
+
+
+@metrics.timed()
+def get_dynamodb_table_data(
+    table_name: str,
+    query: str = "",
+    dynamodb=None,
+    cache_ttl: float = None,
+    **kwargs,
+):
+    """
+    Get all the (deserialized) items of a table, see `iter_dynamodb_table_pages`. If a `cache_ttl` (in seconds) is
+    given, the items are kept in memory & reused until they are older than the TTL - for tables that are read
+    repeatedly, use `get_dynamodb_table_frame`, which can also cache to disk & refresh incrementally.
+    """
+    dynamodb = init_dynamodb_client(dynamodb)
+    if cache_ttl is not None:
+        key = (
+            "data",
+            get_client_key(dynamodb),
+            table_name,
+            query,
+            _to_cache_key(kwargs),
+        )
+        cached = _get_cached(key, cache_ttl)
+        if cached is not None:
+            metrics.increment("dynamodb.cache_hits")
+            # a copy, so a caller changing the list doesn't change what later calls get
+            return list(cached)
+
+    data = list(iter_dynamodb_table_data(table_name, query, dynamodb, **kwargs))
     log.success(f"Scanned {len(data)} items")
+
+    if cache_ttl is not None:
+        _set_cached(key, data)
+        return list(data)
     return data
+
+
+def _to_cache_key(kwargs: dict):
+    return repr(sorted(kwargs.items()))
+
+
+# ---------------------------------------------------
+#  DynamoDB Table Data -> Polars / Parquet
+def iter_dynamodb_table_frames(
+    table_name: str,
+    query: str = "",
+    dynamodb=None,
+    frame_schema: dict = None,
+    use_decimal: bool = False,
+    **kwargs,
+):
+    """
+    Stream a table as one Polars DataFrame per page, so the items are only ever held as python dicts one page at
+    a time. Takes the same arguments as `iter_dynamodb_table_pages`.
+
+    :param frame_schema: Optional Polars schema (column -> dtype). If given, any attributes not in the schema are
+        dropped, otherwise the schema is inferred from each page
+    :param use_decimal: Return numbers as `Decimal` (Polars `Decimal` columns) or as `int`/`float`
+    :return: Generator of DataFrames
+    """
+    for page in iter_dynamodb_table_pages(
+        table_name, query, dynamodb, use_decimal=use_decimal, for_frame=True, **kwargs
+    ):
+        if page:
+            yield _to_frame(page, frame_schema)
+
+
+def _to_frame(page: list[dict], frame_schema: dict = None):
+    import polars as pl
+
+    try:
+        return pl.from_dicts(page, schema=frame_schema, infer_schema_length=None)
+    except pl.ComputeError:
+        # DynamoDB doesn't enforce the type of (non-key) attributes, so an attribute with different types in
+        # different items (e.g. `1` & `"a"`) is stored as text
+        kinds = {}
+        for item in page:
+            for k, v in item.items():
+                if v is not None:
+                    kinds.setdefault(k, set()).add(_get_kind(v))
+        mixed = {k for k, v in kinds.items() if len(v) > 1}
+        if not mixed:
+            raise
+        page = [
+            {k: _to_text(v) if k in mixed else v for k, v in item.items()}
+            for item in page
+        ]
+        return pl.from_dicts(page, schema=frame_schema, infer_schema_length=None)
+
+
+def _concat_frames(frames: list):
+    # pages can infer different columns/dtypes, so align the columns & relax the dtypes to a common supertype
+    import polars as pl
+
+    columns = list(dict.fromkeys(c for frame in frames for c in frame.columns))
+    return pl.concat(
+        [
+            frame.select(
+                [
+                    pl.col(c) if c in frame.columns else pl.lit(None).alias(c)
+                    for c in columns
+                ]
+            )
+            for frame in frames
+        ],
+        how="vertical_relaxed",
+    )
+
+
+@metrics.timed()
+def get_dynamodb_table_frame(
+    table_name: str,
+    query: str = "",
+    dynamodb=None,
+    frame_schema: dict = None,
+    cache_ttl: float = None,
+    refresh_attribute: str = None,
+    **kwargs,
+):
+    """
+    Get all the items of a table as a single Polars DataFrame, see `iter_dynamodb_table_frames`.
+
+    If a `cache_ttl` (in seconds) is given, the frame is cached in memory & as an Arrow IPC file in
+    `config.paths.working/dynamodb`, and reused (across runs) until it is older than the TTL. Once it has expired, a
+    `refresh_attribute` (e.g. an `updated_at` timestamp set on every write) lets only the items changed since the
+    last read be fetched & merged in by the table's key. Deleted items aren't picked up by an incremental refresh -
+    delete the cache file to force a full read.
+
+    :param cache_ttl: Max age (in seconds) of the cached frame
+    :param refresh_attribute: Attribute used to only fetch the items changed since the last read
+    :return: DataFrame
+    """
+    if cache_ttl is None:
+        return _scan_table_frame(table_name, query, dynamodb, frame_schema, **kwargs)
+
+    dynamodb = init_dynamodb_client(dynamodb)
+    key = (
+        "frame",
+        get_client_key(dynamodb),
+        table_name,
+        query,
+        repr(frame_schema),
+        _to_cache_key(kwargs),
+    )
+    data = _get_cached(key, cache_ttl)
+    if data is not None:
+        metrics.increment("dynamodb.cache_hits")
+        return data
+
+    path = _get_frame_cache_path(table_name, key)
+    meta, data = _load_frame_cache(path)
+    if data is not None and time.time() - meta["fetched_at"] < cache_ttl:
+        metrics.increment("dynamodb.cache_hits")
+        log.debug(f"Read from cache - {path}")
+    elif data is not None and refresh_attribute and meta["watermark"] is not None:
+        metrics.increment("dynamodb.cache_refreshes")
+        # timestamped before the refresh, so items written during it are fetched again next time
+        fetched_at = time.time()
+        data = _refresh_table_frame(
+            data,
+            meta["watermark"],
+            table_name,
+            query,
+            dynamodb,
+            frame_schema,
+            refresh_attribute,
+            **kwargs,
+        )
+        meta = _save_frame_cache(path, data, fetched_at, refresh_attribute)
+    else:
+        metrics.increment("dynamodb.cache_misses")
+        fetched_at = time.time()
+        data = _scan_table_frame(table_name, query, dynamodb, frame_schema, **kwargs)
+        meta = _save_frame_cache(path, data, fetched_at, refresh_attribute)
+
+    # the frame may have been read from disk part way through its TTL
+    _set_cached(key, data, age=time.time() - meta["fetched_at"])
+    return data
+
+
+def _get_frame_cache_path(table_name: str, key: tuple):
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+    folder = create_dir_if_not_exist(config.get_path("working", "dynamodb"))
+    return os.path.join(folder, f"{sanitize_filename(table_name)}-{digest}.json")
+
+
+def _load_frame_cache(path: str):
+    import polars as pl
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # not memory-mapped, so the file can be removed while the frame is in use (e.g. on Windows)
+        data = pl.read_ipc(
+            os.path.join(os.path.dirname(path), meta["file"]), memory_map=False
+        )
+        return meta, data
+    except FileNotFoundError:
+        return None, None
+    except Exception as e:
+        log.warning(f"Ignoring unreadable cache - {path} - {e}")
+        return None, None
+
+
+def _save_frame_cache(
+    path: str, data, fetched_at: float, refresh_attribute: str = None
+) -> dict:
+    watermark = None
+    if refresh_attribute and refresh_attribute in data.columns:
+        watermark = data[refresh_attribute].max()
+        if not isinstance(watermark, (str, int, float)):
+            watermark = None
+
+    # each save writes the frame to a new file, which the meta file (replaced in one step) points to - so other
+    # processes always read a frame with its own `watermark`, & never a partially written one
+    folder = os.path.dirname(path)
+    _generation = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+    _file = f"{os.path.basename(path)[:-len('.json')]}.{_generation}.arrow"
+    data.write_ipc(os.path.join(folder, _file), compression="lz4")
+
+    meta = {"fetched_at": fetched_at, "watermark": watermark, "file": _file}
+    try:
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    _tmp = f"{path}.{_generation}.tmp"
+    with open(_tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(_tmp, path)
+
+    if previous is not None and previous.get("file") not in (None, _file):
+        try:
+            os.remove(os.path.join(folder, previous["file"]))
+        except OSError:
+            pass  # removed by another process, or still open on Windows
+    return meta
+
+
+def _refresh_table_frame(
+    data,
+    since,
+    table_name: str,
+    query: str,
+    dynamodb,
+    frame_schema: dict,
+    refresh_attribute: str,
+    **kwargs,
+):
+    # `>=` rather than `>`, so items written in the same instant as the last read aren't missed - any items that
+    # are fetched again replace themselves
+    filter_expression = "#_refresh >= :_since"
+    if kwargs.get("filter_expression"):
+        filter_expression = f"({kwargs['filter_expression']}) AND {filter_expression}"
+    kwargs = kwargs | {
+        "filter_expression": filter_expression,
+        "expression_attribute_names": (kwargs.get("expression_attribute_names") or {})
+        | {"#_refresh": refresh_attribute},
+        "expression_attribute_values": (kwargs.get("expression_attribute_values") or {})
+        # DynamoDB doesn't accept floats
+        | {":_since": Decimal(str(since)) if isinstance(since, float) else since},
+    }
+
+    changed = _scan_table_frame(table_name, query, dynamodb, frame_schema, **kwargs)
+    if not len(changed):
+        return data
+
+    key_schema = describe_dynamodb_table(table_name, dynamodb, cache_ttl=60 * 60)[
+        "KeySchema"
+    ]
+    return _concat_frames([data, changed]).unique(
+        subset=[k["AttributeName"] for k in key_schema],
+        keep="last",
+        maintain_order=True,
+    )
+
+
+def _scan_table_frame(
+    table_name: str, query: str = "", dynamodb=None, frame_schema: dict = None, **kwargs
+):
+    frames = list(
+        iter_dynamodb_table_frames(table_name, query, dynamodb, frame_schema, **kwargs)
+    )
+    if not frames:
+        import polars as pl
+
+        return pl.DataFrame(schema=frame_schema)
+
+    data = _concat_frames(frames).rechunk()
+    log.success(f"Scanned {len(data)} items")
+    return data
+
+
+@metrics.timed()
+def export_dynamodb_table_to_parquet(
+    table_name: str,
+    data_folder: str = None,
+    query: str = "",
+    dynamodb=None,
+    frame_schema: dict = None,
+    partition_by: str = None,
+    rows_per_file: int = 500_000,
+    **kwargs,
+):
+    """
+    Export a table to Parquet files in (roughly) constant memory, by writing a new part file every
+    `rows_per_file` rows - no file has more. Takes the same arguments as `iter_dynamodb_table_pages`.
+
+    :param table_name: Name of the DynamoDB table
+    :param data_folder: Folder to write the files into (defaults to `config.paths.working/<table_name>`)
+    :param query: Key condition expression, see `iter_dynamodb_table_pages`
+    :param dynamodb: Optional existing boto3 DynamoDB client
+    :param frame_schema: Optional Polars schema - recommended so all the part files share the same schema
+    :param partition_by: Optional column to partition the files by, written as `<column>=<value>` subfolders
+    :param rows_per_file: Max number of rows held in memory & written per part file
+    :return: List of the written file paths
+    """
+    data_folder = create_dir_if_not_exist(
+        data_folder or config.get_path("working", table_name)
+    )
+
+    files = []
+
+    def _write(frames: list):
+        data = _concat_frames(frames)
+        partitions = (
+            data.partition_by(partition_by, as_dict=True)
+            if partition_by
+            else {None: data}
+        )
+        for value, partition in partitions.items():
+            _dir = data_folder
+            if partition_by:
+                _dir = create_dir_if_not_exist(
+                    os.path.join(
+                        data_folder, sanitize_filename(f"{partition_by}={value}")
+                    )
+                )
+            _path = os.path.join(_dir, f"part-{len(files):05d}.parquet")
+            partition.write_parquet(_path)
+            files.append(_path)
+            log.debug(f"Written - {_path} ({len(partition)} rows)")
+
+    buffered, buffered_rows, total_rows = [], 0, 0
+    for frame in iter_dynamodb_table_frames(
+        table_name, query, dynamodb, frame_schema, **kwargs
+    ):
+        total_rows += len(frame)
+        # a page can be bigger than the room left in the file, so it's split across files
+        while len(frame):
+            _part = frame.slice(0, rows_per_file - buffered_rows)
+            buffered.append(_part)
+            buffered_rows += len(_part)
+            frame = frame.slice(len(_part))
+            if buffered_rows >= rows_per_file:
+                _write(buffered)
+                buffered, buffered_rows = [], 0
+    if buffered:
+        _write(buffered)
+
+    log.success(f"Exported {total_rows} items to {len(files)} files - {data_folder}")
+    return files
+
+
+# ---------------------------------------------------
+#  Batch reads & writes
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+
+
+class TBatchResult(TypedDict):
+    items: list[dict]
+    count: int
+    consumed_capacity: float
+    unprocessed: list[dict]
+    errors: list[str]
+
+
+def _chunk(values: list, size: int):
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def _backoff(attempt: int, base: float = 0.05, cap: float = 20):
+    # "full jitter" exponential backoff, so throttled workers don't all retry at the same moment
+    time.sleep(random.uniform(0, min(cap, base * 2**attempt)))
+
+
+def _get_consumed_capacity(res: dict):
+    return sum(c.get("CapacityUnits", 0) for c in res.get("ConsumedCapacity", []))
+
+
+def _to_key(item: dict, key_attributes) -> str:
+    # identifies a (serialized) item by its key attributes, e.g. to drop duplicate keys from a batch
+    return json.dumps(
+        {k: item.get(k) for k in key_attributes}, sort_keys=True, default=repr
+    )
+
+
+def _get_key_attributes(table_name: str, client) -> list[str]:
+    table = describe_dynamodb_table(table_name, client, cache_ttl=300)
+    return [k["AttributeName"] for k in table["KeySchema"]]
+
+
+def _run_batches(
+    table_name: str, requests: list, size: int, send_batch, max_workers: int
+):
+    result = TBatchResult(
+        items=[], count=0, consumed_capacity=0, unprocessed=[], errors=[]
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for items, count, consumed_capacity, unprocessed, error in executor.map(
+            send_batch, _chunk(requests, size)
+        ):
+            result["items"].extend(items)
+            result["count"] += count
+            result["consumed_capacity"] += consumed_capacity
+            result["unprocessed"].extend(unprocessed)
+            if error:
+                result["errors"].append(error)
+
+    metrics.increment("dynamodb.consumed_capacity", result["consumed_capacity"])
+    if result["unprocessed"]:
+        log.error(
+            f"{len(result['unprocessed'])} requests still unprocessed after retrying - {table_name}"
+        )
+    return result
+
+
+@metrics.timed()
+def batch_write(
+    table_name: str,
+    items: list[dict] = None,
+    delete_keys: list[dict] = None,
+    dynamodb_client=None,
+    max_workers: int = 8,
+    max_retries: int = 8,
+    key_attributes: list[str] = None,
+) -> TBatchResult:
+    """
+    Put (and/or delete) many items using concurrent `BatchWriteItem` requests of 25 items each. Any
+    `UnprocessedItems` (e.g. due to throttling) are retried with jittered exponential backoff.
+
+    DynamoDB rejects a whole batch with the same key twice, so only the last request per key is sent (deletes come
+    after the puts).
+
+    :param table_name: Name of the DynamoDB table
+    :param items: Items (as plain python values) to put
+    :param delete_keys: Keys (as plain python values) of the items to delete
+    :param dynamodb_client: Optional existing boto3 DynamoDB client
+    :param max_workers: Max number of batches sent at the same time
+    :param max_retries: Max number of retries for the unprocessed items of a batch
+    :param key_attributes: Names of the table's key attributes (defaults to the table's key schema)
+    :return: Number of written items, consumed write capacity & any requests left unprocessed (with the errors of
+        any batches that failed)
+    """
+    from boto3.dynamodb.types import TypeSerializer
+
+    client = init_dynamodb_client(dynamodb_client)
+    type_serializer = TypeSerializer()
+
+    def _serialize(item: dict):
+        return {k: type_serializer.serialize(v) for k, v in item.items()}
+
+    key_attributes = key_attributes or _get_key_attributes(table_name, client)
+    requests = {}
+    for i in items or []:
+        _item = _serialize(i)
+        requests[_to_key(_item, key_attributes)] = {"PutRequest": {"Item": _item}}
+    for k in delete_keys or []:
+        _key = _serialize(k)
+        # removed first, so the delete is sent after the put of an earlier item with the same key
+        requests.pop(_to_key(_key, key_attributes), None)
+        requests[_to_key(_key, key_attributes)] = {"DeleteRequest": {"Key": _key}}
+    _duplicates = len(items or []) + len(delete_keys or []) - len(requests)
+    if _duplicates:
+        log.debug(f"Dropped {_duplicates} requests for duplicate keys - {table_name}")
+    requests = list(requests.values())
+
+    def _send_batch(batch: list):
+        pending, consumed_capacity = batch, 0
+        for attempt in range(max_retries + 1):
+            if attempt:
+                _backoff(attempt)
+            try:
+                res = client.batch_write_item(
+                    RequestItems={table_name: pending}, ReturnConsumedCapacity="TOTAL"
+                )
+            except Exception as e:
+                # e.g. a `ValidationException` for duplicate keys - only this batch's requests are left unprocessed
+                log.error(f"Batch failed - {table_name} - {e}")
+                return [], len(batch) - len(pending), consumed_capacity, pending, str(e)
+            consumed_capacity += _get_consumed_capacity(res)
+            pending = res.get("UnprocessedItems", {}).get(table_name, [])
+            if not pending:
+                break
+            metrics.increment("dynamodb.throttles")
+            metrics.increment("dynamodb.retries", len(pending))
+            log.debug(f"Retrying {len(pending)} unprocessed items - {table_name}")
+        return [], len(batch) - len(pending), consumed_capacity, pending, ""
+
+    result = _run_batches(
+        table_name, requests, BATCH_WRITE_SIZE, _send_batch, max_workers
+    )
+    log.success(
+        f"Written {result['count']} items ({result['consumed_capacity']} WCU) - {table_name}"
+    )
+    return result
+
+
+@metrics.timed()
+def batch_get(
+    table_name: str,
+    keys: list[dict],
+    dynamodb_client=None,
+    projection_expression: str = None,
+    expression_attribute_names: dict = None,
+    consistent_read: bool = False,
+    max_workers: int = 8,
+    max_retries: int = 8,
+    use_decimal: bool = True,
+) -> TBatchResult:
+    """
+    Get many items by key using concurrent `BatchGetItem` requests of 100 keys each. Any `UnprocessedKeys`
+    (e.g. due to throttling) are retried with jittered exponential backoff. Items are not returned in key order, and
+    duplicate keys are only fetched (& returned) once - DynamoDB rejects a whole batch with the same key twice.
+
+    :param table_name: Name of the DynamoDB table
+    :param keys: Keys (as plain python values) of the items to get
+    :param dynamodb_client: Optional existing boto3 DynamoDB client
+    :param projection_expression: Optional attributes to return
+    :param expression_attribute_names: Placeholder names used in the projection expression
+    :param consistent_read: Use strongly consistent reads
+    :param max_workers: Max number of batches sent at the same time
+    :param max_retries: Max number of retries for the unprocessed keys of a batch
+    :param use_decimal: Return numbers as `Decimal` or as `int`/`float`, see `compile_deserializer`
+    :return: Items found, consumed read capacity & any keys left unprocessed (with the errors of any batches that
+        failed)
+    """
+    from boto3.dynamodb.types import TypeSerializer
+
+    client = init_dynamodb_client(dynamodb_client)
+    type_serializer = TypeSerializer()
+    deserialize_item = compile_deserializer(use_decimal=use_decimal)
+
+    request = {"ConsistentRead": consistent_read}
+    if projection_expression:
+        request["ProjectionExpression"] = projection_expression
+    if expression_attribute_names:
+        request["ExpressionAttributeNames"] = expression_attribute_names
+
+    requests = {}
+    for key in keys:
+        _key = {k: type_serializer.serialize(v) for k, v in key.items()}
+        requests.setdefault(_to_key(_key, sorted(_key)), _key)
+    if len(requests) < len(keys):
+        log.debug(f"Dropped {len(keys) - len(requests)} duplicate keys - {table_name}")
+    requests = list(requests.values())
+
+    def _send_batch(batch: list):
+        pending, consumed_capacity, items = batch, 0, []
+        for attempt in range(max_retries + 1):
+            if attempt:
+                _backoff(attempt)
+            try:
+                res = client.batch_get_item(
+                    RequestItems={table_name: request | {"Keys": pending}},
+                    ReturnConsumedCapacity="TOTAL",
+                )
+            except Exception as e:
+                # e.g. a `ValidationException` for duplicate keys - only this batch's keys are left unprocessed
+                log.error(f"Batch failed - {table_name} - {e}")
+                return items, len(items), consumed_capacity, pending, str(e)
+            consumed_capacity += _get_consumed_capacity(res)
+            items.extend(
+                deserialize_item(i) for i in res["Responses"].get(table_name, [])
+            )
+            pending = res.get("UnprocessedKeys", {}).get(table_name, {}).get("Keys", [])
+            if not pending:
+                break
+            metrics.increment("dynamodb.throttles")
+            metrics.increment("dynamodb.retries", len(pending))
+            log.debug(f"Retrying {len(pending)} unprocessed keys - {table_name}")
+        return items, len(items), consumed_capacity, pending, ""
+
+    result = _run_batches(
+        table_name, requests, BATCH_GET_SIZE, _send_batch, max_workers
+    )
+    log.success(
+        f"Fetched {result['count']} items ({result['consumed_capacity']} RCU) - {table_name}"
+    )
+    return result
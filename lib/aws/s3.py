@@ -1,7 +1,16 @@
+import functools
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from typing import TypedDict
 
-import boto3
-
+from lib.aws.client import get_client
+from shared import metrics
 from shared.config import config
 from shared.logging import getLogger
 from shared.utils import create_dir_if_not_exist
@@ -12,12 +21,7 @@ log = getLogger(__name__)
 
 def init_s3_client(s3_client=None):
     if s3_client is None:
-        return boto3.client(
-            "s3",
-            aws_access_key_id=config.aws.access_key_id,
-            aws_secret_access_key=config.aws.secret_access_key,
-            aws_session_token=config.aws.session_token,
-        )
+        return get_client("s3")
     else:
         return s3_client
 
@@ -33,6 +37,7 @@ class TFileMeta(TypedDict):
     subfolders: list[str]
     org: str
     location: str
+    download_seconds: float
 
 
 def _handle_file_meta(s3_filepath: str, meta: TFileMeta):
@@ -42,31 +47,95 @@ def _handle_file_meta(s3_filepath: str, meta: TFileMeta):
     return meta
 
 
-def list_files_in_bucket(
-    bucket_id: str, handle_file_meta=_handle_file_meta, s3_client=None
+def _add_file_meta(client, bucket_id: str, file: dict, handle_file_meta):
+    with metrics.timer("s3.head_object_seconds"):
+        _meta = client.head_object(Bucket=bucket_id, Key=file["Key"])["Metadata"]
+    metrics.increment("s3.files_listed")
+    file["meta"] = handle_file_meta(file["Key"], _meta)
+    log.debug(f'Meta added -  {file["meta"]["filename"]}')
+    return file
+
+
+def iter_files_in_bucket(
+    bucket_id: str,
+    handle_file_meta=_handle_file_meta,
+    s3_client=None,
+    prefix: str = "",
+    delimiter: str = "",
+    max_workers: int = 16,
 ):
+    """
+    Stream the (non-empty) files in a bucket, following continuation tokens, and enrich each file with its
+    `head_object` metadata using a bounded thread pool that shares a single client.
+
+    Files are yielded as soon as their metadata is ready, so the order is not guaranteed to match S3's listing.
+
+    :param bucket_id: Name of the S3 bucket
+    :param handle_file_meta: Function to transform the raw metadata into a `TFileMeta` dict
+    :param s3_client: Optional existing boto3 S3 client
+    :param prefix: Only list keys starting with this prefix (e.g. to shard a listing by folder)
+    :param delimiter: Group keys on this delimiter (e.g. `/`) - grouped `CommonPrefixes` are not yielded
+    :param max_workers: Max number of concurrent `head_object` requests
+    :return: Generator of file dicts (as returned by `list_objects_v2`) with an added `meta` key
+    """
     client = init_s3_client(s3_client)
-    s3_bucket_objects = client.list_objects_v2(
-        Bucket=bucket_id,
-        # Delimiter='string',
-        # EncodingType='url',
-        # Marker='string',
-        # MaxKeys=123,
-        # Prefix='string',
-        # RequestPayer='requester',
-        # ExpectedBucketOwner='string'
+    objects = _iter_objects_in_bucket(client, bucket_id, prefix, delimiter)
+    yield from _iter_with_file_meta(
+        client, bucket_id, objects, handle_file_meta, max_workers
     )
 
-    # Add metadata (e.g. uploader details to file list)
-    s3_files = []
-    for f in s3_bucket_objects["Contents"]:
-        if f["Size"] > 0:
-            _meta = client.head_object(Bucket=bucket_id, Key=f["Key"])["Metadata"]
-            _meta = handle_file_meta(f["Key"], _meta)
-            f["meta"] = _meta
-            log.debug(f'Meta added -  {f["meta"]["filename"]}')
 
-            s3_files.append(f)
+def _iter_objects_in_bucket(client, bucket_id: str, prefix="", delimiter=""):
+    paginator = client.get_paginator("list_objects_v2")
+    page_iterator = paginator.paginate(
+        Bucket=bucket_id, Prefix=prefix, Delimiter=delimiter
+    )
+    for page in page_iterator:
+        for f in page.get("Contents", []):
+            if f["Size"] > 0:
+                yield f
+
+
+def _iter_with_file_meta(
+    client, bucket_id: str, files, handle_file_meta, max_workers: int
+):
+    # cap the number of in-flight requests so memory doesn't grow with the size of the bucket
+    max_pending = max_workers * 4
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for f in files:
+            pending.add(
+                executor.submit(_add_file_meta, client, bucket_id, f, handle_file_meta)
+            )
+
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        for future in as_completed(pending):
+            yield future.result()
+
+
+@metrics.timed()
+def list_files_in_bucket(
+    bucket_id: str,
+    handle_file_meta=_handle_file_meta,
+    s3_client=None,
+    prefix: str = "",
+    delimiter: str = "",
+    max_workers: int = 16,
+):
+    s3_files = list(
+        iter_files_in_bucket(
+            bucket_id,
+            handle_file_meta,
+            s3_client=s3_client,
+            prefix=prefix,
+            delimiter=delimiter,
+            max_workers=max_workers,
+        )
+    )
 
     log.success("FETCHED LIST OF FILES FROM S3")
     return s3_files
@@ -77,19 +146,156 @@ def _get_nested_subfolders(file_path: str, meta: TFileMeta):
     return f"{file_path}\\{subfolders}"
 
 
+@functools.lru_cache(maxsize=None)
+def get_default_transfer_config():
+    # Tuned for many medium-sized files, where latency (not bandwidth) is the bottleneck
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=8 * 1024 * 1024,
+        max_concurrency=4,
+        use_threads=True,
+    )
+
+
+class _ByteBudget:
+    """
+    Blocks until there is room for another `n` bytes to be in-flight. A single file larger than the budget is
+    still allowed through on its own, so it can't deadlock the batch.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, n: int):
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.in_flight == 0 or self.in_flight + n <= self.max_bytes
+            )
+            self.in_flight += n
+
+    def release(self, n: int):
+        with self._condition:
+            self.in_flight -= n
+            self._condition.notify_all()
+
+
+def _get_cache(use_cache: bool = None):
+    if use_cache is None:
+        use_cache = config.cache_enabled
+    if not use_cache:
+        return None
+    from shared.cache import get_file_cache
+
+    return get_file_cache()
+
+
+def _fetch_file(
+    client,
+    bucket_id: str,
+    file: dict,
+    filepath: str,
+    transfer_config,
+    max_retries: int,
+):
+    for attempt in range(1, max_retries + 1):
+        try:
+            _start = time.perf_counter()
+            client.download_file(
+                bucket_id, file["Key"], filepath, Config=transfer_config
+            )
+            _seconds = time.perf_counter() - _start
+            metrics.observe("s3.download_seconds", _seconds)
+            metrics.increment("s3.files_downloaded")
+            metrics.increment("s3.bytes_downloaded", file["Size"])
+            return _seconds
+        except Exception as e:
+            if attempt == max_retries:
+                metrics.increment("s3.download_failures")
+                raise
+            metrics.increment("s3.download_retries")
+            log.warning(
+                f'Download failed (attempt {attempt}/{max_retries}) - {file["Key"]} - {e}'
+            )
+            time.sleep(min(2**attempt, 30) * random.uniform(0.5, 1))
+
+
+def _download_file(
+    client,
+    bucket_id: str,
+    file: dict,
+    filepath: str,
+    transfer_config,
+    max_retries: int,
+    cache=None,
+):
+    if cache is None:
+        return _fetch_file(
+            client, bucket_id, file, filepath, transfer_config, max_retries
+        )
+
+    # fetch the file into the cache (unless it's already there) & link it into place, rather than copying it
+    _start = time.perf_counter()
+    _etag = file["ETag"]
+    cached = cache.get(bucket_id, file["Key"], _etag)
+    if cached is None:
+        cached = cache.put(
+            bucket_id,
+            file["Key"],
+            _etag,
+            lambda _tmp: _fetch_file(
+                client, bucket_id, file, _tmp, transfer_config, max_retries
+            ),
+        )
+    cache.link(cached, filepath)
+    return time.perf_counter() - _start
+
+
+@metrics.timed()
 def download_files_from_bucket(
     files: list[dict],
     bucket_id: str,
-    data_folder: str = config.paths.raw,
+    data_folder: str = None,
     get_nested_folder_path=_get_nested_subfolders,
     s3_client=None,
+    max_workers: int = 8,
+    transfer_config=None,
+    max_inflight_bytes: int = 512 * 1024 * 1024,
+    max_retries: int = 3,
+    use_cache: bool = None,
 ):
+    """
+    Download files (as returned by `list_files_in_bucket`) concurrently. Each file is downloaded in ranged parts
+    according to `transfer_config`, and failed files are retried without stopping the rest of the batch.
+
+    With the cache enabled, files are fetched into the shared cache (see `shared.cache`) & hardlinked into
+    `data_folder`, so files already downloaded by any project/run aren't downloaded again.
+
+    :param files: List of file dicts with a `meta` key
+    :param bucket_id: Name of the S3 bucket
+    :param data_folder: Root folder to download the files into (defaults to `config.paths.raw`)
+    :param get_nested_folder_path: Function to build the folder path for a file from its meta
+    :param s3_client: Optional existing boto3 S3 client
+    :param max_workers: Max number of files downloaded at the same time
+    :param transfer_config: boto3 `TransferConfig` controlling the per-file multipart range concurrency (defaults to
+        `get_default_transfer_config()`)
+    :param max_inflight_bytes: Max total size of the files being downloaded at the same time
+    :param max_retries: Max number of attempts per file before it is marked as failed
+    :param use_cache: Use the shared file cache (defaults to the `CACHE` env variable)
+    :return: The same `files` list, with `location` & `download_seconds` added to the meta of downloaded files
+    """
     client = init_s3_client(s3_client)
-    for file in files:
+    data_folder = data_folder or config.paths.raw
+    transfer_config = transfer_config or get_default_transfer_config()
+    cache = _get_cache(use_cache)
+    budget = _ByteBudget(max_inflight_bytes)
+
+    def _download(file: dict, _dir: str):
         _meta = file["meta"]
-        _dir = get_nested_folder_path(data_folder, _meta)
-        # Check if the file is currently accessible (hasn't been archived)
-        if file["StorageClass"] != "GLACIER" and file["StorageClass"] != "DEEP_ARCHIVE":
+        try:
             # sanitise the folder path & recursively create the subfolders if they don't exist
             _sanitized_dir = create_dir_if_not_exist(sanitize_folder_path(_dir))
 
@@ -97,30 +303,688 @@ def download_files_from_bucket(
             _sanitized_filename = sanitize_filename(_meta["filename"])
 
             # download the actual file from s3 into the filepath
-            client.download_file(
-                bucket_id, file["Key"], f"{_sanitized_dir}\\{_sanitized_filename}"
+            _seconds = _download_file(
+                client,
+                bucket_id,
+                file,
+                f"{_sanitized_dir}\\{_sanitized_filename}",
+                transfer_config,
+                max_retries,
+                cache,
             )
-            file["meta"]["location"] = _sanitized_dir
-            log.success(f'Downloaded - {_sanitized_dir}\\{_meta["filename"]}')
-        else:
-            log.warning(
-                f'File in long term storage & cannot be retrieved - {_dir}\\{_meta["filename"]}'
+            _meta["location"] = _sanitized_dir
+            _meta["download_seconds"] = _seconds
+            log.success(
+                f'Downloaded - {_sanitized_dir}\\{_meta["filename"]} ({_seconds:.2f}s)'
             )
+            return file["Size"]
+        except Exception as e:
+            log.error(f'Download failed - {_dir}\\{_meta["filename"]} - {e}')
+            return 0
+        finally:
+            budget.release(file["Size"])
+
+    _start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for file in files:
+            _meta = file["meta"]
+            _dir = get_nested_folder_path(data_folder, _meta)
+            # Check if the file is currently accessible (hasn't been archived)
+            if file["StorageClass"] not in ("GLACIER", "DEEP_ARCHIVE"):
+                budget.acquire(file["Size"])
+                futures.append(executor.submit(_download, file, _dir))
+            else:
+                log.warning(
+                    f'File in long term storage & cannot be retrieved - {_dir}\\{_meta["filename"]}'
+                )
+
+        downloaded_bytes = sum(f.result() for f in futures)
+
+    _seconds = time.perf_counter() - _start
+    _mb = downloaded_bytes / (1024 * 1024)
+    log.success(
+        f"ALL FILES DOWNLOADED - {_mb:.1f} MB in {_seconds:.2f}s ({_mb / max(_seconds, 1e-9):.2f} MB/s)"
+    )
+    return files
+
+
+# ---------------------------------------------------
+#  Incremental sync
+def _get_manifest_path(bucket_id: str, prefix: str = "") -> str:
+    _name = sanitize_filename(f"{bucket_id}_{prefix}" if prefix else bucket_id, "_")
+    return config.get_path("working", f"s3_manifest_{_name}.json")
+
+
+def _load_manifest(manifest_path: str) -> dict:
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest_path: str, manifest: dict):
+    # write to a temp file first so an interrupted run can't leave a corrupt manifest
+    _tmp_path = f"{manifest_path}.tmp"
+    with open(_tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(_tmp_path, manifest_path)
+
+
+def _to_manifest_entry(file: dict) -> dict:
+    return {
+        "ETag": file["ETag"],
+        "Size": file["Size"],
+        "LastModified": file["LastModified"].isoformat(),
+    }
+
 
-    log.success("ALL FILES DOWNLOADED")
+@metrics.timed()
+def sync_files_from_bucket(
+    bucket_id: str,
+    prefix: str = "",
+    data_folder: str = None,
+    handle_file_meta=_handle_file_meta,
+    get_nested_folder_path=_get_nested_subfolders,
+    s3_client=None,
+    prune: bool = False,
+    max_workers: int = 16,
+    **download_kwargs,
+):
+    """
+    Download only the files that are new or have changed since the last sync. A manifest of the ETag, size &
+    last modified date of each downloaded file is kept per bucket/prefix under `config.paths.working`.
+
+    :param bucket_id: Name of the S3 bucket
+    :param prefix: Only sync keys starting with this prefix
+    :param data_folder: Root folder to download the files into (defaults to `config.paths.raw`)
+    :param handle_file_meta: Function to transform the raw metadata into a `TFileMeta` dict
+    :param get_nested_folder_path: Function to build the folder path for a file from its meta
+    :param s3_client: Optional existing boto3 S3 client
+    :param prune: Delete local files that no longer exist in the bucket
+    :param max_workers: Max number of concurrent `head_object` requests
+    :param download_kwargs: Extra arguments passed through to `download_files_from_bucket`
+    :return: List of the files that were downloaded in this sync
+    """
+    client = init_s3_client(s3_client)
+    manifest_path = _get_manifest_path(bucket_id, prefix)
+    manifest = _load_manifest(manifest_path)
+
+    # compare the listing against the manifest before fetching any metadata, so unchanged files cost nothing
+    listed_keys = set()
+    changed = []
+    for f in _iter_objects_in_bucket(client, bucket_id, prefix):
+        listed_keys.add(f["Key"])
+        _entry = manifest.get(f["Key"])
+        if _entry is None or any(
+            _entry[k] != v for k, v in _to_manifest_entry(f).items()
+        ):
+            changed.append(f)
+    log.info(f"{len(changed)}/{len(listed_keys)} files are new or changed")
+
+    files = list(
+        _iter_with_file_meta(client, bucket_id, changed, handle_file_meta, max_workers)
+    )
+    download_files_from_bucket(
+        files,
+        bucket_id,
+        data_folder,
+        get_nested_folder_path,
+        s3_client=client,
+        **download_kwargs,
+    )
+
+    for f in files:
+        # only files that were actually downloaded have a location
+        if "location" in f["meta"]:
+            manifest[f["Key"]] = _to_manifest_entry(f) | {
+                "filepath": f'{f["meta"]["location"]}\\{sanitize_filename(f["meta"]["filename"])}'
+            }
+
+    if prune:
+        for key in set(manifest) - listed_keys:
+            _filepath = manifest.pop(key)["filepath"]
+            if os.path.exists(_filepath):
+                os.remove(_filepath)
+                log.info(f"Pruned - {_filepath}")
+
+    _save_manifest(manifest_path, manifest)
+    log.success(f"SYNCED {len(files)} FILES FROM S3")
     return files
 
 
 def download_all_files_from_bucket(
     bucket_id: str,
-    data_folder: str = config.paths.raw,
+    data_folder: str = None,
     handle_file_meta=_handle_file_meta,
     get_nested_folder_path=_get_nested_subfolders,
     s3_client=None,
+    sync: bool = False,
+    prefix: str = "",
+    prune: bool = False,
 ):
     client = init_s3_client(s3_client)
-    files_list = list_files_in_bucket(bucket_id, handle_file_meta, s3_client=client)
+    if sync:
+        return sync_files_from_bucket(
+            bucket_id,
+            prefix,
+            data_folder,
+            handle_file_meta,
+            get_nested_folder_path,
+            s3_client=client,
+            prune=prune,
+        )
+
+    files_list = list_files_in_bucket(
+        bucket_id, handle_file_meta, s3_client=client, prefix=prefix
+    )
     downloaded_files = download_files_from_bucket(
         files_list, bucket_id, data_folder, get_nested_folder_path, s3_client=client
     )
     return downloaded_files
+
+
+# ---------------------------------------------------
+#  Uploads
+class TUploadResult(TypedDict):
+    filepath: str
+    key: str
+    sha256: str
+    status: str  # `uploaded`, `unchanged` or `failed`
+    error: str
+
+
+def _get_key(data_folder: str, filepath: str, prefix: str = ""):
+    # paths may use either slash style, but keys always use `/`
+    _relative = os.path.relpath(filepath, data_folder).replace("\\", "/")
+    return f"{prefix}{_relative}"
+
+
+def _get_sha256(filepath: str, chunk_size: int = 8 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_uploaded_sha256(client, bucket_id: str, key: str):
+    try:
+        _meta = client.head_object(Bucket=bucket_id, Key=key)["Metadata"]
+    except client.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return _meta.get("sha256")
+
+
+def _to_upload_metadata(key: str, metadata: dict = None, sha256: str = None):
+    # mirrors the meta read back by `_handle_file_meta` - S3 metadata values must be strings
+    _parts = key.split("/")
+    _meta = {"filename": _parts[-1], "subfolders": "/".join(_parts[0:-1])}
+    _meta |= {k: str(v) for k, v in (metadata or {}).items()}
+    if sha256:
+        _meta["sha256"] = sha256
+    return _meta
+
+
+def _upload_file(
+    client,
+    bucket_id: str,
+    filepath: str,
+    key: str,
+    extra_args: dict,
+    transfer_config,
+    max_retries: int,
+):
+    for attempt in range(1, max_retries + 1):
+        try:
+            _start = time.perf_counter()
+            client.upload_file(
+                filepath, bucket_id, key, ExtraArgs=extra_args, Config=transfer_config
+            )
+            _seconds = time.perf_counter() - _start
+            metrics.observe("s3.upload_seconds", _seconds)
+            metrics.increment("s3.files_uploaded")
+            metrics.increment("s3.bytes_uploaded", os.path.getsize(filepath))
+            return _seconds
+        except Exception as e:
+            if attempt == max_retries:
+                metrics.increment("s3.upload_failures")
+                raise
+            metrics.increment("s3.upload_retries")
+            log.warning(
+                f"Upload failed (attempt {attempt}/{max_retries}) - {key} - {e}"
+            )
+            time.sleep(min(2**attempt, 30) * random.uniform(0.5, 1))
+
+
+@metrics.timed()
+def upload_files_to_bucket(
+    filepaths: list[str],
+    bucket_id: str,
+    data_folder: str = None,
+    prefix: str = "",
+    metadata: dict = None,
+    s3_client=None,
+    max_workers: int = 8,
+    transfer_config=None,
+    max_retries: int = 3,
+    skip_unchanged: bool = True,
+) -> list[TUploadResult]:
+    """
+    Upload files concurrently, each in multipart chunks according to `transfer_config`. The SHA-256 of each file
+    is stored in its metadata & S3 verifies each part's checksum on upload. Files whose hash matches the uploaded
+    object are skipped.
+
+    :param filepaths: Paths of the files to upload
+    :param bucket_id: Name of the S3 bucket
+    :param data_folder: Folder the keys are relative to (defaults to `config.paths.outputs`), e.g.
+        `<data_folder>/a/b.csv` -> `<prefix>a/b.csv`
+    :param prefix: Prefix added to each key
+    :param metadata: Extra metadata attached to each object (alongside the `filename`, `subfolders` & `sha256`)
+    :param s3_client: Optional existing boto3 S3 client
+    :param max_workers: Max number of files uploaded at the same time
+    :param transfer_config: boto3 `TransferConfig` controlling the per-file multipart concurrency (defaults to
+        `get_default_transfer_config()`)
+    :param max_retries: Max number of attempts per file before it is marked as failed
+    :param skip_unchanged: Skip files that are already uploaded with the same hash
+    :return: Result for each file
+    """
+    client = init_s3_client(s3_client)
+    data_folder = data_folder or config.paths.outputs
+    transfer_config = transfer_config or get_default_transfer_config()
+
+    def _upload(filepath: str) -> TUploadResult:
+        key = _get_key(data_folder, filepath, prefix)
+        sha256 = ""
+        try:
+            sha256 = _get_sha256(filepath)
+            if (
+                skip_unchanged
+                and _get_uploaded_sha256(client, bucket_id, key) == sha256
+            ):
+                metrics.increment("s3.files_unchanged")
+                log.debug(f"Unchanged - {key}")
+                return TUploadResult(
+                    filepath=filepath,
+                    key=key,
+                    sha256=sha256,
+                    status="unchanged",
+                    error="",
+                )
+
+            extra_args = {
+                "Metadata": _to_upload_metadata(key, metadata, sha256),
+                "ChecksumAlgorithm": "SHA256",
+            }
+            _seconds = _upload_file(
+                client,
+                bucket_id,
+                filepath,
+                key,
+                extra_args,
+                transfer_config,
+                max_retries,
+            )
+            log.success(f"Uploaded - {key} ({_seconds:.2f}s)")
+            return TUploadResult(
+                filepath=filepath, key=key, sha256=sha256, status="uploaded", error=""
+            )
+        except Exception as e:
+            log.error(f"Upload failed - {key} - {e}")
+            return TUploadResult(
+                filepath=filepath, key=key, sha256=sha256, status="failed", error=str(e)
+            )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_upload, filepaths))
+
+    _counts = {
+        s: sum(r["status"] == s for r in results)
+        for s in ("uploaded", "unchanged", "failed")
+    }
+    log.success(
+        f"ALL FILES UPLOADED - {_counts['uploaded']} uploaded, {_counts['unchanged']} unchanged, "
+        f"{_counts['failed']} failed"
+    )
+    return results
+
+
+def upload_folder_to_bucket(
+    bucket_id: str, data_folder: str = None, prefix: str = "", **upload_kwargs
+) -> list[TUploadResult]:
+    """
+    Upload every file in a folder (recursively), keeping the folder structure in the keys. Takes the same arguments
+    as `upload_files_to_bucket`.
+    """
+    data_folder = data_folder or config.paths.outputs
+    filepaths = [
+        os.path.join(root, f) for root, _, files in os.walk(data_folder) for f in files
+    ]
+    return upload_files_to_bucket(
+        filepaths, bucket_id, data_folder, prefix, **upload_kwargs
+    )
+
+
+class _IterableReader(io.RawIOBase):
+    """
+    Read-only file object over an iterable of `bytes` chunks, hashing the data as it's read.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b"")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            # a memoryview, so taking what's left after each read doesn't copy the chunk
+            self._buffer = memoryview(
+                chunk.encode() if isinstance(chunk, str) else chunk
+            ).cast("B")
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self.sha256.update(self._buffer[:n])
+        self.size += n
+        self._buffer = self._buffer[n:]
+        return n
+
+
+@metrics.timed()
+def upload_stream_to_bucket(
+    chunks,
+    bucket_id: str,
+    key: str,
+    metadata: dict = None,
+    s3_client=None,
+    transfer_config=None,
+) -> TUploadResult:
+    """
+    Upload the data yielded by an iterable/generator (of `bytes` or `str` chunks) without writing it to disk first.
+    Only a few parts are held in memory at a time, and they are uploaded concurrently as the data is generated.
+
+    As the data isn't known up front, the object's SHA-256 can't be stored in its metadata (or compared before
+    uploading) - it is returned instead. S3 still verifies each part's checksum.
+
+    :param chunks: Iterable of `bytes` (or `str`, encoded as utf-8) chunks
+    :param bucket_id: Name of the S3 bucket
+    :param key: Key of the object
+    :param metadata: Extra metadata attached to the object (alongside the `filename` & `subfolders`)
+    :param s3_client: Optional existing boto3 S3 client
+    :param transfer_config: boto3 `TransferConfig` controlling the part size & concurrency (defaults to
+        `get_default_transfer_config()`)
+    :return: Upload result
+    """
+    client = init_s3_client(s3_client)
+    transfer_config = transfer_config or get_default_transfer_config()
+    reader = _IterableReader(chunks)
+    extra_args = {
+        "Metadata": _to_upload_metadata(key, metadata),
+        "ChecksumAlgorithm": "SHA256",
+    }
+
+    _start = time.perf_counter()
+    try:
+        # a non-seekable file is read sequentially, with the parts uploaded by the transfer manager's threads
+        client.upload_fileobj(
+            io.BufferedReader(reader, transfer_config.multipart_chunksize),
+            bucket_id,
+            key,
+            ExtraArgs=extra_args,
+            Config=transfer_config,
+        )
+    except Exception as e:
+        metrics.increment("s3.upload_failures")
+        log.error(f"Upload failed - {key} - {e}")
+        return TUploadResult(
+            filepath="", key=key, sha256="", status="failed", error=str(e)
+        )
+
+    _seconds = time.perf_counter() - _start
+    metrics.observe("s3.upload_seconds", _seconds)
+    metrics.increment("s3.files_uploaded")
+    metrics.increment("s3.bytes_uploaded", reader.size)
+    log.success(
+        f"Uploaded - {key} ({reader.size / (1024 * 1024):.1f} MB in {_seconds:.2f}s)"
+    )
+    return TUploadResult(
+        filepath="",
+        key=key,
+        sha256=reader.sha256.hexdigest(),
+        status="uploaded",
+        error="",
+    )
+
+
+# ---------------------------------------------------
+#  Streaming reads (straight into memory, without writing to `config.paths.raw`)
+_FILE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".jsonl": "ndjson",
+    ".ndjson": "ndjson",
+}
+
+
+def _to_range_header(byte_range: tuple[int, int]):
+    # `(start, end)` -> `bytes=start-end` (`end` is inclusive, like the HTTP header) - `end=None` reads to the end
+    start, end = byte_range
+    return f"bytes={start}-{'' if end is None else end}"
+
+
+def open_s3_object(
+    bucket_id: str, key: str, s3_client=None, byte_range: tuple[int, int] = None
+):
+    """
+    Open an object for streaming - the body is only downloaded as it is read.
+
+    :param bucket_id: Name of the S3 bucket
+    :param key: Key of the object
+    :param s3_client: Optional existing boto3 S3 client
+    :param byte_range: Optional `(start, end)` byte range to read (inclusive) - `end=None` reads to the end
+    :return: File-like `StreamingBody` - supports `read`, `iter_chunks` & `iter_lines`
+    """
+    client = init_s3_client(s3_client)
+    params = {"Bucket": bucket_id, "Key": key}
+    if byte_range is not None:
+        params["Range"] = _to_range_header(byte_range)
+    return client.get_object(**params)["Body"]
+
+
+def _get_object_part(client, bucket_id: str, key: str, start: int, end: int):
+    res = client.get_object(
+        Bucket=bucket_id, Key=key, Range=_to_range_header((start, end))
+    )
+    return res, res["Body"].read()
+
+
+def _get_cached_object(client, cache, bucket_id: str, key: str):
+    # the ETag is needed to know whether the cached file is still up to date
+    _etag = client.head_object(Bucket=bucket_id, Key=key)["ETag"]
+    path = cache.get(bucket_id, key, _etag)
+    if path is None:
+        path = cache.put(
+            bucket_id,
+            key,
+            _etag,
+            lambda _tmp: client.download_file(
+                bucket_id, key, _tmp, Config=get_default_transfer_config()
+            ),
+        )
+    return path
+
+
+def _read_file(path: str, start: int = 0, end: int = None):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read() if end is None else f.read(end - start + 1)
+
+
+@metrics.timed("s3.read_object_seconds")
+def read_s3_object(
+    bucket_id: str,
+    key: str,
+    s3_client=None,
+    byte_range: tuple[int, int] = None,
+    part_size: int = 8 * 1024 * 1024,
+    max_workers: int = 8,
+    use_cache: bool = None,
+) -> bytes:
+    """
+    Read an object (or a byte range of it) into memory. Large objects are fetched as `part_size` byte ranges in
+    parallel, like a multipart download.
+
+    With the cache enabled, whole objects are read through the shared cache (see `shared.cache`), while byte
+    ranges are only read from the cache (after the first part) if the object is already cached.
+
+    :param bucket_id: Name of the S3 bucket
+    :param key: Key of the object
+    :param s3_client: Optional existing boto3 S3 client
+    :param byte_range: Optional `(start, end)` byte range to read (inclusive) - `end=None` reads to the end
+    :param part_size: Size of each ranged request
+    :param max_workers: Max number of ranged requests at the same time
+    :param use_cache: Use the shared file cache (defaults to the `CACHE` env variable)
+    :return: Contents of the object
+    """
+    client = init_s3_client(s3_client)
+    start, end = byte_range if byte_range is not None else (0, None)
+
+    cache = _get_cache(use_cache)
+    if cache is not None and byte_range is None:
+        return _read_file(_get_cached_object(client, cache, bucket_id, key))
+
+    # the first part also returns the total size of the object, so no `head_object` call is needed
+    first_end = (
+        start + part_size - 1 if end is None else min(end, start + part_size - 1)
+    )
+    try:
+        res, first = _get_object_part(client, bucket_id, key, start, first_end)
+    except client.exceptions.ClientError as e:
+        # ranges can't be requested from empty objects
+        if e.response["Error"]["Code"] != "InvalidRange" or start != 0:
+            raise
+        return client.get_object(Bucket=bucket_id, Key=key)["Body"].read()
+
+    total_size = int(res["ContentRange"].rsplit("/", 1)[1])
+    end = total_size - 1 if end is None else min(end, total_size - 1)
+    ranges = [
+        (s, min(s + part_size - 1, end))
+        for s in range(first_end + 1, end + 1, part_size)
+    ]
+    if ranges and cache is not None:
+        # the first part's ETag tells whether the cached object is up to date, without a `head_object` call
+        path = cache.get(bucket_id, key, res["ETag"])
+        if path is not None:
+            data = first + _read_file(path, first_end + 1, end)
+            metrics.increment("s3.bytes_read", len(data))
+            return data
+    parts = [first]
+    if ranges:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            parts += [
+                body
+                for _, body in executor.map(
+                    lambda r: _get_object_part(client, bucket_id, key, *r), ranges
+                )
+            ]
+
+    data = b"".join(parts)
+    metrics.increment("s3.bytes_read", len(data))
+    return data
+
+
+def _get_readers(file_format: str):
+    import polars as pl
+
+    # (eager reader, lazy scanner) - JSON lines are always read eagerly, `pl.scan_ndjson` can't push much down
+    return {
+        "csv": (pl.read_csv, pl.scan_csv),
+        "parquet": (pl.read_parquet, pl.scan_parquet),
+        "ndjson": (pl.read_ndjson, None),
+    }[file_format]
+
+
+def _check_read_kwargs(file_format: str, read_kwargs: dict):
+    # the object is read or scanned depending on the cache, so only the arguments both take are allowed - they
+    # then mean the same whether the cache is enabled or not
+    import inspect
+
+    read, scan = _get_readers(file_format)
+    allowed = set(inspect.signature(read).parameters) - {"source", "columns"}
+    if scan is not None:
+        allowed &= set(inspect.signature(scan).parameters)
+    unsupported = sorted(set(read_kwargs) - allowed)
+    if unsupported:
+        raise TypeError(
+            f"Unsupported arguments for reading `{file_format}` objects: {', '.join(unsupported)} - "
+            f"expected any of {', '.join(sorted(allowed))}"
+        )
+
+
+def scan_s3_object(
+    bucket_id: str,
+    key: str,
+    file_format: str = None,
+    columns: list[str] = None,
+    s3_client=None,
+    use_cache: bool = None,
+    **read_kwargs,
+):
+    """
+    Read a CSV, Parquet or JSON lines object into a Polars LazyFrame.
+
+    With the cache enabled, the object is fetched into the shared cache & lazily scanned from there, so filters &
+    selections on the LazyFrame are pushed down to the reader (e.g. skipping Parquet row groups & columns).
+
+    Otherwise this is an in-memory read rather than a real scan - Polars 0.19 can't scan S3 objects, so the whole
+    object is fetched into memory (see `read_s3_object`) & the `columns` given are parsed up front. Any further
+    filters & selections on the LazyFrame run on that in-memory data.
+
+    JSON lines objects are always read eagerly (from the cache, if it's enabled).
+
+    :param bucket_id: Name of the S3 bucket
+    :param key: Key of the object
+    :param file_format: `csv`, `parquet` or `ndjson` (defaults to the format matching the key's extension)
+    :param columns: Optional columns to read (all columns if not given)
+    :param s3_client: Optional existing boto3 S3 client
+    :param use_cache: Use the shared file cache (defaults to the `CACHE` env variable)
+    :param read_kwargs: Extra arguments taken by both `pl.read_<format>` & `pl.scan_<format>` (e.g. `separator`,
+        `dtypes` or `n_rows`), so they mean the same with or without the cache
+    :return: LazyFrame
+    """
+    file_format = file_format or _FILE_FORMATS.get(os.path.splitext(key)[1].lower())
+    if file_format not in ("csv", "parquet", "ndjson"):
+        raise ValueError(
+            f"Unknown file format for `{key}` - expected `csv`, `parquet` or `ndjson`"
+        )
+    _check_read_kwargs(file_format, read_kwargs)
+    read, scan = _get_readers(file_format)
+
+    cache = _get_cache(use_cache)
+    if cache is not None:
+        source = _get_cached_object(init_s3_client(s3_client), cache, bucket_id, key)
+        if scan is not None:
+            frame = scan(source, **read_kwargs)
+            log.debug(f"Scanning - s3://{bucket_id}/{key} (cached - {source})")
+            return frame if columns is None else frame.select(columns)
+    else:
+        source = io.BytesIO(read_s3_object(bucket_id, key, s3_client, use_cache=False))
+
+    if scan is not None:
+        frame = read(source, columns=columns, **read_kwargs)
+    else:
+        frame = read(source, **read_kwargs)
+        if columns is not None:
+            frame = frame.select(columns)
+
+    log.debug(f"Read - s3://{bucket_id}/{key} ({len(frame)} rows)")
+    return frame.lazy()
@@ -1,6 +1,7 @@
 # %% Import packages
 from projects.example.demo import project_specific_function
 from shared.config import config
+from shared.profiling import run
 
 
 # %% Main function
@@ -14,5 +15,6 @@ def main():
 
 
 # %% This is executed when run from the command line
+#    (set `PROFILE=all` or pass `--profile=all` to profile the run)
 if __name__ == "__main__":
-    main()
+    run(main)
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+from shared import metrics
+from shared.config import config
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class FileCache:
+    """
+    On-disk cache of (S3) objects, keyed by bucket, key & ETag - so an object that has changed is never served
+    from the cache. Files are written to a temporary file & renamed into place, so any number of processes can
+    share the cache folder, and the least recently used files (going by a `.used` marker next to each) are evicted
+    once it grows beyond `max_bytes`.
+    """
+
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # estimated size of the cache, corrected by scanning the folder whenever it goes over `max_bytes` (other
+        # processes may be adding/evicting files too)
+        self._size = None
+
+    def _get_cache_path(self, bucket_id: str, key: str, etag: str):
+        digest = hashlib.sha256(f"{bucket_id}\0{key}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.folder, digest[:2], digest)
+
+    def _record(self, stat: str, value: int = 1):
+        with self._lock:
+            setattr(self, stat, getattr(self, stat) + value)
+        metrics.increment(f"cache.{stat}", value)
+
+    def get(self, bucket_id: str, key: str, etag: str) -> str | None:
+        """
+        :return: Path of the cached file, or `None` if it isn't cached
+        """
+        path = self._get_cache_path(bucket_id, key, etag)
+        if not os.path.exists(path):
+            self._record("misses")
+            return None
+        _mark_used(path)
+        self._record("hits")
+        return path
+
+    def put(self, bucket_id: str, key: str, etag: str, write) -> str:
+        """
+        Add a file to the cache.
+
+        :param write: Function that writes the file, given the (temporary) path to write it to
+        :return: Path of the cached file
+        """
+        path = self._get_cache_path(bucket_id, key, etag)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(_tmp)
+            # readers either see the whole file or no file at all
+            os.replace(_tmp, path)
+        finally:
+            if os.path.exists(_tmp):
+                os.remove(_tmp)
+        _mark_used(path)
+
+        self._add_size(os.path.getsize(path), path)
+        return path
+
+    def put_bytes(self, bucket_id: str, key: str, etag: str, data: bytes) -> str:
+        def _write(path: str):
+            with open(path, "wb") as f:
+                f.write(data)
+
+        return self.put(bucket_id, key, etag, _write)
+
+    @staticmethod
+    def link(path: str, dest: str):
+        """
+        Hardlink a cached file to `dest` (falling back to a copy, e.g. when they're on different drives), so the
+        file isn't copied. The link shares the cached file's data, so it shouldn't be modified in place.
+        """
+        _tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(path, _tmp)
+        except OSError:
+            shutil.copyfile(path, _tmp)
+        os.replace(_tmp, dest)
+
+    def _add_size(self, size: int, path: str):
+        with self._lock:
+            if self._size is not None and self._size + size <= self.max_bytes:
+                self._size += size
+                return
+            self._evict(keep=path)
+
+    def _evict(self, keep: str = None):
+        files, used = {}, {}
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                if name.endswith(".tmp"):
+                    # left behind by a process that was killed mid-write
+                    if time.time() - stat.st_mtime > 24 * 60 * 60:
+                        _remove(path)
+                    continue
+                if name.endswith(_USED_SUFFIX):
+                    used[path[: -len(_USED_SUFFIX)]] = stat.st_mtime
+                    continue
+                files[path] = stat
+
+        for path in used.keys() - files.keys():
+            _remove(f"{path}{_USED_SUFFIX}")  # the file was evicted by another process
+        # least recently used first - files without a marker (e.g. mid-`put`) by when they were written
+        files = sorted(
+            (used.get(path, stat.st_mtime), stat.st_size, path)
+            for path, stat in files.items()
+        )
+
+        size = sum(f[1] for f in files)
+        evicted = 0
+        for _, file_size, path in files:
+            if size <= self.max_bytes:
+                break
+            # never evict the file that was just added, even if it's bigger than the whole cache
+            if path != keep and _remove(path):
+                _remove(f"{path}{_USED_SUFFIX}")
+                size -= file_size
+                evicted += 1
+        self._size = size
+
+        if evicted:
+            self.evictions += evicted
+            metrics.increment("cache.evictions", evicted)
+            log.debug(f"Evicted {evicted} files from the cache - {self.folder}")
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0,
+            }
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.folder, ignore_errors=True)
+            self._size = 0
+
+
+_USED_SUFFIX = ".used"
+
+
+def _mark_used(path: str):
+    # the LRU eviction goes by the modified time of a marker file next to each cached file - not of the file
+    # itself, which shares its inode (& so its modified time) with every hardlink made by `link`
+    marker = f"{path}{_USED_SUFFIX}"
+    try:
+        os.utime(marker)
+    except FileNotFoundError:
+        try:
+            open(marker, "a").close()
+        except OSError:
+            pass  # the folder was evicted/cleared by another process meanwhile
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        # already removed by another process, or still open on Windows
+        return False
+
+
+def get_file_cache() -> FileCache:
+    """
+    Get the cache shared by all projects, in `config.paths.cache` & bounded by `CACHE_MAX_BYTES`.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FileCache(config.paths.cache, config.cache_max_bytes)
+    return _cache
@@ -1,36 +1,91 @@
 import os
+import threading
 from dataclasses import dataclass, field
+from functools import cached_property
 
-from dotenv import load_dotenv
 import logging
 
 from shared.utils import create_dir_if_not_exist
 
+_env_loaded = False
+_env_lock = threading.Lock()
 
-# Load Local Environment Variables
-_local_env = os.path.join(os.path.abspath("."), ".env")
-if os.path.exists(_local_env):
-    load_dotenv(_local_env)
 
-# Load Root Environment Variables
-_root_env = os.path.normpath(os.path.join(os.path.dirname(__file__), "../../.env"))
-if os.path.exists(_root_env):
-    load_dotenv(_root_env)
+def _load_env_files() -> None:
+    # only loaded on first access of a setting, so importing the config has no side effects
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
 
-# Load Shared Environment Variables
-load_dotenv(
-    os.path.normpath(os.path.join(os.path.dirname(__file__), "../../.env.shared"))
-)
+        # Load Local Environment Variables
+        _local_env = os.path.join(os.path.abspath("."), ".env")
+        if os.path.exists(_local_env):
+            load_dotenv(_local_env)
+
+        # Load Root Environment Variables
+        _root_env = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../../.env")
+        )
+        if os.path.exists(_root_env):
+            load_dotenv(_root_env)
+
+        # Load Shared Environment Variables
+        load_dotenv(
+            os.path.normpath(
+                os.path.join(os.path.dirname(__file__), "../../.env.shared")
+            )
+        )
+        _env_loaded = True
+
+
+def _to_bool(value: str) -> bool:
+    return str(value).lower() in ("1", "true")
+
+
+class _Env:
+    """
+    Setting that is read from an env variable on first access (after the `.env` files are loaded), and cached.
+    """
+
+    def __init__(self, name: str, default=None, cast=None):
+        self.name = name
+        self.default = default
+        self.cast = cast
+
+    def __set_name__(self, owner, attr: str):
+        self.attr = attr
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        _load_env_files()
+        value = os.getenv(self.name, self.default)
+        if self.cast is not None and value is not None:
+            value = self.cast(value)
+        instance.__dict__[self.attr] = value
+        return value
+
+
+def _getenv(name: str, default=None):
+    _load_env_files()
+    return os.getenv(name, default)
 
 
 @dataclass(frozen=True)
 class DataPaths:
-    root: str = os.getenv("ROOT_PATH", os.path.abspath("."))
+    root: str = field(
+        default_factory=lambda: _getenv("ROOT_PATH", os.path.abspath("."))
+    )
     data_root: str = field(init=False)
     raw: str = field(init=False)
     working: str = field(init=False)
     outputs: str = field(init=False)
     logs: str = field(init=False)
+    cache: str = field(init=False)
 
     def __post_init__(self):
         _data_root = os.getenv("DATA_ROOT_PATH", os.path.join(self.root, "⚡️data"))
@@ -51,6 +106,9 @@ class DataPaths:
         object.__setattr__(
             self, "logs", os.getenv("LOGS_PATH", os.path.join(_data_root, "🔧 logs"))
         )
+        object.__setattr__(
+            self, "cache", os.getenv("CACHE_PATH", os.path.join(_data_root, "📦 cache"))
+        )
 
     def _get_path(self, path: str) -> str:
         if path == "root":
@@ -69,15 +127,37 @@ class DataPaths:
 
 @dataclass(frozen=True)
 class AwsConfig:
-    access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-    secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-    session_token = os.getenv("AWS_SESSION_TOKEN")
+    access_key_id = _Env("AWS_ACCESS_KEY_ID")
+    secret_access_key = _Env("AWS_SECRET_ACCESS_KEY")
+    session_token = _Env("AWS_SESSION_TOKEN")
+    profile = _Env(
+        "AWS_PROFILE"
+    )  # only used to key cached results, boto3 reads it itself
+    region = _Env("AWS_REGION")  # boto3 falls back to `AWS_DEFAULT_REGION` itself
+    max_pool_connections = _Env("AWS_MAX_POOL_CONNECTIONS", 50, int)
+    retry_mode = _Env("AWS_RETRY_MODE", "standard")
+    max_attempts = _Env("AWS_MAX_ATTEMPTS", 5, int)
 
 
 @dataclass(frozen=True)
 class __DefaultConfig:
-    log_level = os.getenv("log_level", logging.INFO)
-    paths: DataPaths = DataPaths()
+    log_level = _Env("log_level", logging.INFO)
+    log_format = _Env("LOG_FORMAT", "color")  # `color` or `json`
+    log_queue = _Env("LOG_QUEUE", False, _to_bool)
+    log_console_level = _Env("LOG_CONSOLE_LEVEL")
+    log_file = _Env("LOG_FILE", False, _to_bool)
+    log_file_rotate = _Env("LOG_FILE_ROTATE", "size")  # `size` or `time`
+    log_file_max_bytes = _Env("LOG_FILE_MAX_BYTES", 50 * 1024 * 1024, int)
+    log_file_when = _Env("LOG_FILE_WHEN", "midnight")
+    log_file_backup_count = _Env("LOG_FILE_BACKUP_COUNT", 10, int)
+    metrics_enabled = _Env("METRICS", False, _to_bool)
+    metrics_export = _Env("METRICS_EXPORT", "log")  # `log`, `prometheus` or `json`
+    metrics_flush_interval = _Env("METRICS_FLUSH_INTERVAL", 60, float)
+    profile = _Env("PROFILE", "")  # e.g. `cprofile,sample,memory` or `all`
+    profile_sample_interval = _Env("PROFILE_SAMPLE_INTERVAL", 0.01, float)
+    profile_memory_frames = _Env("PROFILE_MEMORY_FRAMES", 1, int)
+    cache_enabled = _Env("CACHE", False, _to_bool)
+    cache_max_bytes = _Env("CACHE_MAX_BYTES", 10 * 1024 * 1024 * 1024, int)
     aws: AwsConfig = AwsConfig()
 
     def __init__(self, settings=None):
@@ -85,11 +165,17 @@ class __DefaultConfig:
             # attach settings to the config
             self.__dict__["settings"] = {} | settings
 
-        self._setup_paths()
+    @cached_property
+    def paths(self) -> DataPaths:
+        # resolved (& the directories created) on first access, rather than on import
+        paths = DataPaths()
+        self._setup_paths(paths)
+        return paths
 
-    def _setup_paths(self) -> None:
+    @staticmethod
+    def _setup_paths(paths: DataPaths) -> None:
         # Create working file directories
-        for p in vars(self.paths).items():
+        for p in vars(paths).items():
             if p[0] != "root":
                 create_dir_if_not_exist(p[1])
 
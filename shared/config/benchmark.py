@@ -0,0 +1,133 @@
+"""
+Import-time benchmark (& guard) of the `lib/aws` & `shared` modules, e.g.
+
+    python -m shared.config.benchmark
+    python -m shared.config.benchmark --top 30
+
+Every module is imported in a fresh `python -X importtime` process, from an empty directory. Importing them must
+not load any of `HEAVY_MODULES` (they're imported on first use) nor create any data folders - if either happens,
+the offending modules/folders are logged & the exit code is 1.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+HEAVY_MODULES = ("boto3", "botocore", "polars", "colorama", "dotenv")
+PACKAGES = ("lib/aws", "shared")
+_REPO_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+# the data paths default to (or are overridden by) these, so they're unset to keep them in the empty directory
+_PATH_ENV_VARS = (
+    "ROOT_PATH",
+    "DATA_ROOT_PATH",
+    "RAW_PATH",
+    "WORKING_PATH",
+    "OUTPUTS_PATH",
+    "LOGS_PATH",
+    "CACHE_PATH",
+)
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+_SCRIPT = """
+import importlib, sys
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(" ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def get_modules() -> list[str]:
+    modules = []
+    for package in PACKAGES:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(_REPO_ROOT, package)):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "_")))
+            _package = os.path.relpath(dirpath, _REPO_ROOT).replace(os.sep, ".")
+            for filename in sorted(filenames):
+                name, ext = os.path.splitext(filename)
+                if ext != ".py":
+                    continue
+                modules.append(_package if name == "__init__" else f"{_package}.{name}")
+    return modules
+
+
+def check_imports(modules: list[str] = None) -> dict:
+    """
+    Import `modules` (defaults to every `lib/aws` & `shared` module) in a fresh process from an empty directory.
+
+    :return: Dict of the `HEAVY_MODULES` that were `loaded`, the files/folders that were `created` in the directory
+        & the `import_times` of every module that was imported, as (module, self µs, cumulative µs, depth)
+    """
+    modules = modules or get_modules()
+    env = {k: v for k, v in os.environ.items() if k not in _PATH_ENV_VARS}
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [_REPO_ROOT, env.get("PYTHONPATH")])
+    )
+    with tempfile.TemporaryDirectory() as cwd:
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                _SCRIPT.format(heavy=HEAVY_MODULES),
+            ]
+            + modules,
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        created = sorted(os.listdir(cwd))
+    if process.returncode:
+        raise RuntimeError(f"Importing the modules failed:\n{process.stderr}")
+
+    import_times = []
+    for line in process.stderr.splitlines():
+        if match := _IMPORT_TIME.match(line):
+            _self, _cumulative, _indent, name = match.groups()
+            import_times.append((name, int(_self), int(_cumulative), len(_indent) // 2))
+    return {
+        "loaded": process.stdout.split(),
+        "created": created,
+        "import_times": import_times,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--top", type=int, default=15, help="Number of the slowest imports to log"
+    )
+    args = parser.parse_args()
+    modules = get_modules()
+    result = check_imports(modules)
+
+    _total = sum(t[2] for t in result["import_times"] if not t[3])
+    log.info(
+        f"Imported {len(modules)} modules in {_total / 1000:.1f}ms "
+        f"({len(result['import_times'])} modules in total)"
+    )
+    for name, _self, _cumulative, _ in sorted(
+        result["import_times"], key=lambda t: t[2], reverse=True
+    )[: args.top]:
+        log.info(
+            f"{name:<40} :: {_cumulative / 1000:>8.1f}ms (self {_self / 1000:.1f}ms)"
+        )
+
+    if result["loaded"]:
+        log.error(f"Heavy modules loaded on import: {', '.join(result['loaded'])}")
+    if result["created"]:
+        log.error(f"Created on import: {', '.join(result['created'])}")
+    if result["loaded"] or result["created"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
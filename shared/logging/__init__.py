@@ -1,22 +1,36 @@
+import atexit
+import json
 import logging
-from colorama import init, Fore, Style
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
 from shared.config import config
+from shared.logging.file_sink import create_file_sink
 
-init(autoreset=True)
 SUCCESS_LOG_LEVEL = 25
 
 
-class _ColorFormatter(logging.Formatter):
+def _get_colors():
+    # colorama is only imported (& initialised) once a colored handler is actually created
+    from colorama import init, Fore, Style
+
+    init(autoreset=True)
+
     # Change this dictionary to suit your coloring needs!
-    COLORS = {
+    return {
         "DEBUG": Fore.WHITE,
         "INFO": Fore.BLUE,
         "WARNING": Fore.YELLOW,
         "SUCCESS": Fore.GREEN,
         "ERROR": Fore.MAGENTA,
         "CRITICAL": Style.BRIGHT + Fore.RED,
-    }
+    }, Fore.WHITE
+
 
+class _ColorFormatter(logging.Formatter):
     ICONS = {
         "DEBUG": "🔍",
         "INFO": "ℹ️",
@@ -27,28 +41,150 @@ class _ColorFormatter(logging.Formatter):
         "CRITICAL": "🔥",
     }
 
+    def __init__(self, fmt=None, use_color=True):
+        logging.Formatter.__init__(self, fmt)
+        self.colors, self.reset = _get_colors() if use_color else ({}, "")
+
     def format(self, record):
-        color = self.COLORS.get(record.levelname, "")
-        icon = self.ICONS.get(record.levelname, "")
-        if color:
-            record.name = color + record.name + Fore.WHITE
-            record.icon = (
-                color + record.icon if hasattr(record, "icon") else icon + Fore.WHITE
+        # only called for records that pass the level checks - the colored fields are restored afterwards so other
+        # handlers see the original (cheaper than formatting a copy of the record)
+        color = self.colors.get(record.levelname, "")
+        saved = record.name, record.levelname, record.msg, record.args
+        icon = record.__dict__.get("icon")
+        if icon is not None:
+            record.icon = color + icon
+        else:
+            record.icon = self.ICONS.get(record.levelname, "") + (
+                self.reset if color else ""
             )
-            # record.name = Fore.WHITE + record.name + Fore.WHITE
-            record.levelname = color + record.levelname + Fore.WHITE
-            record.msg = color + record.msg + Fore.WHITE
-        return logging.Formatter.format(self, record)
+        if color:
+            record.name = color + record.name + self.reset
+            record.levelname = color + record.levelname + self.reset
+            record.msg = color + record.getMessage() + self.reset
+            record.args = None
+        try:
+            return logging.Formatter.format(self, record)
+        finally:
+            record.name, record.levelname, record.msg, record.args = saved
+            if icon is None:
+                del record.icon
+            else:
+                record.icon = icon
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _create_formatter(stream=None):
+    if config.log_format == "json":
+        return _JsonFormatter()
+    # color codes are just noise when the output is redirected to a file/pipe
+    stream = stream or sys.stderr
+    use_color = hasattr(stream, "isatty") and stream.isatty()
+    # return _ColorFormatter("%(levelname)-18s :: %(name)-10s :: %(message)s", use_color)
+    return _ColorFormatter("%(icon)s %(name)-10s :: %(message)s", use_color)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, queue, handlers: list):
+        logging.handlers.QueueHandler.__init__(self, queue)
+        self.handlers = handlers
+        self._pid = os.getpid()
+
+    def prepare(self, record):
+        # the queue is in-process, so skip the default (full) formatting & copy - only the args need resolving, in
+        # case they are mutated before the listener gets to them
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        # a forked worker process doesn't have the listener thread, so it writes to the handlers directly
+        if os.getpid() != self._pid:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        else:
+            logging.handlers.QueueHandler.emit(self, record)
+
+
+_handlers = None
+_handlers_lock = threading.Lock()
+_listener = None
+
+
+def _get_handlers():
+    """
+    Get the handlers shared by all loggers - the console & (if `LOG_FILE=true`) a rotating JSON file sink in
+    `config.paths.logs`. In queue mode (`LOG_QUEUE=true`), records are put on a queue & formatted/written by a
+    background thread, so logging never blocks on the console or the file.
+    """
+    global _handlers, _listener
+    if _handlers is not None:
+        return _handlers
+
+    with _handlers_lock:
+        if _handlers is None:
+            console = logging.StreamHandler()
+            console.setFormatter(_create_formatter(console.stream))
+            if config.log_console_level:
+                console.setLevel(config.log_console_level)
+            handlers = [console]
+
+            if config.log_file:
+                handlers.append(
+                    create_file_sink(
+                        config.paths.logs,
+                        rotate=config.log_file_rotate,
+                        max_bytes=config.log_file_max_bytes,
+                        when=config.log_file_when,
+                        backup_count=config.log_file_backup_count,
+                        formatter=_JsonFormatter(),
+                    )
+                )
+
+            if config.log_queue:
+                _queue = queue.SimpleQueue()
+                _listener = logging.handlers.QueueListener(
+                    _queue, *handlers, respect_handler_level=True
+                )
+                _listener.start()
+                atexit.register(_listener.stop)
+                handlers = [_QueueHandler(_queue, handlers)]
+            _handlers = handlers
+    return _handlers
 
 
 class _ColorLogger(logging.Logger):
     def __init__(self, name):
         logging.Logger.__init__(self, name)
-        # color_formatter = _ColorFormatter("%(levelname)-18s :: %(name)-10s :: %(message)s")
-        color_formatter = _ColorFormatter("%(icon)s %(name)-10s :: %(message)s")
-        console = logging.StreamHandler()
-        console.setFormatter(color_formatter)
-        self.addHandler(console)
+        self._use_config_level = False
+        self._configured = False
+
+    def _configure(self):
+        # the handlers & level need the config, so they're set up on first use rather than on import
+        self._configured = True
+        if self._use_config_level:
+            self.setLevel(config.log_level)
+        for handler in _get_handlers():
+            self.addHandler(handler)
+
+    def isEnabledFor(self, level):
+        if not self._configured:
+            self._configure()
+        return logging.Logger.isEnabledFor(self, level)
 
     def success(self, msg, *args, **kwargs):
         if self.isEnabledFor(SUCCESS_LOG_LEVEL):
@@ -63,9 +199,15 @@ logging.setLoggerClass(_ColorLogger)
 Logger = logging
 
 
-def getLogger(name: str, level=config.log_level):
+def getLogger(name: str, level=None):
     _logger = Logger.getLogger(name)
-    _logger.setLevel(level)
+    if level is not None:
+        _logger.setLevel(level)
+    elif isinstance(_logger, _ColorLogger) and not _logger._configured:
+        # defaults to `config.log_level`, resolved on first use
+        _logger._use_config_level = True
+    else:
+        _logger.setLevel(config.log_level)
     return _logger
 
 
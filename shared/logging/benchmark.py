@@ -0,0 +1,141 @@
+"""
+Benchmark of the records per second logged by `shared.logging` against the logger it replaced (a console handler
+per logger & a formatter that colored every record), e.g.
+
+    python -m shared.logging.benchmark
+    python -m shared.logging.benchmark --records 500000
+
+Each method is run in a fresh process with its settings (e.g. `LOG_QUEUE=true`), logging to a stream that discards
+the output but reports as a TTY, so the records are colored. Both the records that are written & those that are
+filtered out by the level (`debug` at the default `INFO` level) are timed. In queue mode, the time until the
+listener has written every record is logged too.
+"""
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+METHODS = {
+    "old": None,
+    "direct": {},
+    "queue": {"LOG_QUEUE": "true"},
+    "json": {"LOG_FORMAT": "json"},
+    "json (queue)": {"LOG_FORMAT": "json", "LOG_QUEUE": "true"},
+}
+
+
+class _NullTTY(io.TextIOBase):
+    def write(self, s):
+        return len(s)
+
+    def isatty(self):
+        return True
+
+
+def _get_old_logger(name: str) -> logging.Logger:
+    # the logger `shared.logging` replaced - it's not registered with `logging`, so it doesn't affect the others.
+    # Like it, colorama is initialised first, so the console writes to the (auto-resetting) wrapped `sys.stderr`
+    from colorama import Fore, Style, init
+
+    init(autoreset=True)
+
+    class _OldColorFormatter(logging.Formatter):
+        COLORS = {
+            "DEBUG": Fore.WHITE,
+            "INFO": Fore.BLUE,
+            "WARNING": Fore.YELLOW,
+            "SUCCESS": Fore.GREEN,
+            "ERROR": Fore.MAGENTA,
+            "CRITICAL": Style.BRIGHT + Fore.RED,
+        }
+        ICONS = {"DEBUG": "🔍", "INFO": "ℹ️", "WARNING": "⚠️", "ERROR": "❌"}
+
+        def format(self, record):
+            color = self.COLORS.get(record.levelname, "")
+            icon = self.ICONS.get(record.levelname, "")
+            if color:
+                record.name = color + record.name + Fore.WHITE
+                record.icon = (
+                    color + record.icon
+                    if hasattr(record, "icon")
+                    else icon + Fore.WHITE
+                )
+                record.levelname = color + record.levelname + Fore.WHITE
+                record.msg = color + record.msg + Fore.WHITE
+            return logging.Formatter.format(self, record)
+
+    logger = logging.Logger(name, logging.INFO)
+    console = logging.StreamHandler()
+    console.setFormatter(_OldColorFormatter("%(icon)s %(name)-10s :: %(message)s"))
+    logger.addHandler(console)
+    return logger
+
+
+def _run(method: str, records: int):
+    import shared.logging
+
+    # the console handler writes to `sys.stderr`, so it's replaced before the handlers are created
+    sys.stderr = _NullTTY()
+    if METHODS[method] is None:
+        logger = _get_old_logger("benchmark")
+    else:
+        os.environ.update(METHODS[method])
+        logger = getLogger("benchmark")
+
+    _start = time.perf_counter()
+    for i in range(records):
+        logger.debug("Scanned page %s - %s/%s items", i, 100, 100)
+    filtered = time.perf_counter() - _start
+
+    _start = time.perf_counter()
+    for i in range(records):
+        logger.info("Scanned page %s - %s/%s items", i, 100, 100)
+    written = time.perf_counter() - _start
+
+    drained = None
+    if shared.logging._listener is not None:
+        # waits for the listener to write the queued records
+        shared.logging._listener.stop()
+        drained = time.perf_counter() - _start
+    return written, filtered, drained
+
+
+def _run_in_process(fn, *args):
+    # the settings are read once per process, so each method gets its own
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--records", type=int, default=200_000, help="Number of records per method"
+    )
+    args = parser.parse_args()
+
+    log.info(f"Benchmarking {args.records} records per method")
+    for method in METHODS:
+        written, filtered, drained = _run_in_process(_run, method, args.records)
+        _drained = (
+            f", all written in {drained:.3f}s ({args.records / drained:,.0f} records/s)"
+            if drained is not None
+            else ""
+        )
+        log.info(
+            f"{method:<12} :: {args.records / written:>9,.0f} records/s logged{_drained}, "
+            f"{args.records / filtered:>11,.0f} records/s filtered"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import gzip
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.util
+import os
+import shutil
+import threading
+import time
+
+
+class _CompressOnRotate:
+    """
+    Mixin for the rotating file handlers that gzips each rotated segment in a background thread, so the logging
+    thread only pays for a rename.
+    """
+
+    def _setup_compression(self):
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._rotate
+        self._compress_thread = None
+
+    def doRollover(self):
+        # wait for the previous segment to finish compressing, so it's shifted along with the other segments
+        if self._compress_thread is not None:
+            self._compress_thread.join()
+        super().doRollover()
+
+    def close(self):
+        if self._compress_thread is not None:
+            self._compress_thread.join()
+        super().close()
+
+    def _rotate(self, source: str, dest: str):
+        # `dest` already has the `.gz` suffix from the namer - move the segment aside & compress it in the background
+        _uncompressed = dest[:-3]
+        if os.path.exists(source):
+            os.replace(source, _uncompressed)
+            self._compress_thread = threading.Thread(
+                target=self._compress, args=(_uncompressed, dest), daemon=False
+            )
+            self._compress_thread.start()
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, "rb") as f_in, gzip.open(f"{dest}.tmp", "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(f"{dest}.tmp", dest)
+        os.remove(source)
+
+    def flush(self):
+        # `emit` flushes after every record - leave it to `_BatchingHandler` to flush once per batch instead
+        pass
+
+    def flush_batch(self):
+        logging.StreamHandler.flush(self)
+
+
+class _SizeRotatingFileHandler(_CompressOnRotate, logging.handlers.RotatingFileHandler):
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        logging.handlers.RotatingFileHandler.__init__(
+            self, filename, "a", max_bytes, backup_count, "utf-8", delay=True
+        )
+        self._setup_compression()
+
+
+class _TimeRotatingFileHandler(
+    _CompressOnRotate, logging.handlers.TimedRotatingFileHandler
+):
+    def __init__(self, filename: str, when: str, backup_count: int):
+        logging.handlers.TimedRotatingFileHandler.__init__(
+            self, filename, when, 1, backup_count, "utf-8", delay=True
+        )
+        self._setup_compression()
+
+
+class _BatchingHandler(logging.handlers.MemoryHandler):
+    """
+    Buffers records & writes them to the file in batches - when the buffer is full, a warning (or worse) is
+    logged, or `flush_interval` seconds have passed since the last write. A background thread writes buffered
+    records once they've waited `flush_interval` seconds, even if nothing else is logged.
+    """
+
+    def __init__(self, target, capacity: int, flush_interval: float):
+        logging.handlers.MemoryHandler.__init__(
+            self, capacity, logging.WARNING, target, flushOnClose=True
+        )
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._pid = os.getpid()
+        self._closed = threading.Event()
+        self._flush_thread = None
+        if multiprocessing.parent_process() is not None:
+            self._flush_on_process_exit()
+
+    def emit(self, record):
+        if os.getpid() != self._pid:
+            self._reopen_for_process()
+        logging.handlers.MemoryHandler.emit(self, record)
+        if self._flush_thread is None:
+            self._start_flush_thread()
+
+    def _start_flush_thread(self):
+        # started on the first record (& again in a forked process, which doesn't inherit the thread)
+        with self.lock:
+            if self._flush_thread is None and not self._closed.is_set():
+                self._flush_thread = threading.Thread(
+                    target=self._flush_periodically, name="log-flush", daemon=True
+                )
+                self._flush_thread.start()
+
+    def _flush_periodically(self):
+        # wakes up when the oldest possible buffered record is due, i.e. `flush_interval` after the last write
+        timeout = self.flush_interval
+        while not self._closed.wait(timeout):
+            _elapsed = time.monotonic() - self._last_flush
+            if self.buffer and _elapsed >= self.flush_interval:
+                self.flush()
+                _elapsed = 0
+            timeout = max(self.flush_interval - _elapsed, 0.01)
+
+    def close(self):
+        self._closed.set()
+        if (
+            self._flush_thread is not None
+            and self._flush_thread is not threading.current_thread()
+        ):
+            self._flush_thread.join()
+        logging.handlers.MemoryHandler.close(self)
+
+    def shouldFlush(self, record):
+        return (
+            logging.handlers.MemoryHandler.shouldFlush(self, record)
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self):
+        with self.lock:
+            logging.handlers.MemoryHandler.flush(self)
+            if self.target:
+                self.target.flush_batch()
+            self._last_flush = time.monotonic()
+
+    def _reopen_for_process(self):
+        # a forked worker process inherits the parent's handler - give it its own file (rotating a file shared
+        # between processes isn't safe) & drop the parent's buffered records so they aren't written twice
+        with self.lock:
+            self._pid = os.getpid()
+            self._flush_thread = None
+            self.buffer = []
+            self.target.stream = None
+            self.target.baseFilename = _process_filename(self.target.baseFilename)
+        self._flush_on_process_exit()
+
+    def _flush_on_process_exit(self):
+        # pool workers exit without running `atexit`/`logging.shutdown`, but do run multiprocessing's finalizers
+        multiprocessing.util.Finalize(None, self.flush, exitpriority=10)
+
+
+def _process_filename(filename: str):
+    _root, _ext = os.path.splitext(filename)
+    _root = _root.rsplit(".", 1)[0] if _root.rsplit(".", 1)[-1].isdigit() else _root
+    return f"{_root}.{os.getpid()}{_ext}"
+
+
+def create_file_sink(
+    folder: str,
+    name: str = "app",
+    rotate: str = "size",
+    max_bytes: int = 50 * 1024 * 1024,
+    when: str = "midnight",
+    backup_count: int = 10,
+    capacity: int = 1000,
+    flush_interval: float = 5,
+    formatter: logging.Formatter = None,
+):
+    """
+    Create a buffered file handler that writes to `<folder>/<name>.log`, rotating by size or time & gzipping the
+    rotated segments in the background. Worker processes each write to their own `<name>.<pid>.log` file.
+
+    :param folder: Folder to write the log files into
+    :param name: Name of the log file (without extension)
+    :param rotate: Rotate by `size` or by `time`
+    :param max_bytes: Max size of a log file before it is rotated (size rotation)
+    :param when: When to rotate the log file, e.g. `midnight` or `h` (time rotation - see `TimedRotatingFileHandler`)
+    :param backup_count: Number of rotated segments to keep
+    :param capacity: Max number of records buffered before they are written
+    :param flush_interval: Max number of seconds records are buffered before they are written
+    :param formatter: Formatter used to write the records
+    :return: Logging handler
+    """
+    filename = os.path.join(folder, f"{name}.log")
+    if multiprocessing.parent_process() is not None:
+        filename = _process_filename(filename)
+
+    if rotate == "time":
+        target = _TimeRotatingFileHandler(filename, when, backup_count)
+    else:
+        target = _SizeRotatingFileHandler(filename, max_bytes, backup_count)
+    target.setFormatter(formatter)
+    return _BatchingHandler(target, capacity, flush_interval)
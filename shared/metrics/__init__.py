@@ -0,0 +1,225 @@
+import atexit
+import bisect
+import functools
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import threading
+import time
+
+from shared.config import config
+from shared.logging import getLogger
+
+log = getLogger(__name__)
+
+# upper bounds of the histogram buckets - suits timings in seconds & most counts per call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_flush_pid = None
+
+
+class _Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "buckets": dict(zip([*self.buckets, "+Inf"], self.counts)),
+        }
+
+
+def is_enabled():
+    return config.metrics_enabled
+
+
+def increment(name: str, value: float = 1):
+    if not config.metrics_enabled:
+        return
+    _start_flush_thread()
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float):
+    if not config.metrics_enabled:
+        return
+    _start_flush_thread()
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = _Histogram()
+        _histograms[name].observe(value)
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(name: str):
+    """
+    Context manager that records the duration (in seconds) of its block in the `name` histogram, e.g.
+    `with timer("s3.download_seconds"): ...`
+    """
+    return _Timer(name) if config.metrics_enabled else _NOOP_TIMER
+
+
+def timed(name: str = None):
+    """
+    Decorator that records the duration (in seconds) of each call in the `name` histogram (defaults to the
+    function's qualified name).
+    """
+
+    def decorator(fn):
+        _name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not config.metrics_enabled:
+                return fn(*args, **kwargs)
+            with _Timer(_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {k: h.to_dict() for k, h in _histograms.items()},
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# %% Exporters
+def _to_prometheus(data: dict):
+    def _name(name: str):
+        return "".join(c if c.isalnum() else "_" for c in name)
+
+    lines = []
+    for name, value in data["counters"].items():
+        lines += [f"# TYPE {_name(name)} counter", f"{_name(name)} {value}"]
+    for name, h in data["histograms"].items():
+        _n = _name(name)
+        lines.append(f"# TYPE {_n} histogram")
+        cumulative = 0
+        for bucket, count in h["buckets"].items():
+            cumulative += count
+            lines.append(f'{_n}_bucket{{le="{bucket}"}} {cumulative}')
+        lines += [f"{_n}_sum {h['sum']}", f"{_n}_count {h['count']}"]
+    return "\n".join(lines) + "\n"
+
+
+def _get_export_path(extension: str):
+    # worker processes each export their own file, so they don't overwrite each other
+    _name = "metrics"
+    if multiprocessing.parent_process() is not None:
+        _name = f"metrics.{os.getpid()}"
+    return config.get_path("logs", f"{_name}.{extension}")
+
+
+def flush():
+    """
+    Export the current metrics - to the log, or to a Prometheus textfile / JSON file in `config.paths.logs`
+    (depending on `METRICS_EXPORT`). Metrics are cumulative, so each export replaces the previous one.
+    """
+    if not config.metrics_enabled:
+        return
+    data = snapshot()
+    if config.metrics_export in ("prometheus", "json"):
+        _extension = "prom" if config.metrics_export == "prometheus" else "json"
+        _path = _get_export_path(_extension)
+        with open(f"{_path}.tmp", "w", encoding="utf-8") as f:
+            if config.metrics_export == "prometheus":
+                f.write(_to_prometheus(data))
+            else:
+                json.dump(data, f)
+        # textfile collectors may read the file at any time, so replace it atomically
+        os.replace(f"{_path}.tmp", _path)
+    else:
+        for name, value in data["counters"].items():
+            log.info(f"{name} = {value}")
+        for name, h in data["histograms"].items():
+            log.info(
+                f"{name} = count {h['count']}, sum {h['sum']:.3f}, "
+                f"avg {h['sum'] / max(h['count'], 1):.3f}, min {h['min']:.3f}, max {h['max']:.3f}"
+            )
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(config.metrics_flush_interval)
+        try:
+            flush()
+        except Exception as e:
+            log.error(f"Failed to flush metrics - {e}")
+
+
+def _start_flush_thread():
+    global _flush_pid
+    if _flush_pid == os.getpid():
+        return
+    with _lock:
+        if _flush_pid != os.getpid():
+            if _flush_pid is not None:
+                # a forked worker process inherits the parent's metrics - start from scratch so they aren't counted twice
+                _counters.clear()
+                _histograms.clear()
+            _flush_pid = os.getpid()
+            threading.Thread(
+                target=_flush_periodically, name="metrics-flush", daemon=True
+            ).start()
+            if multiprocessing.parent_process() is None:
+                atexit.register(flush)
+            else:
+                # pool workers exit without running `atexit`, but do run multiprocessing's finalizers
+                multiprocessing.util.Finalize(None, flush, exitpriority=10)
@@ -0,0 +1,234 @@
+import collections
+import itertools
+import json
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import TypedDict
+
+from shared.config import config
+from shared.logging import getLogger
+from shared.utils import create_dir_if_not_exist
+from shared.utils.sanitize import sanitize_filename
+
+log = getLogger(__name__)
+
+
+class TItemResult(TypedDict):
+    id: str
+    success: bool
+    result: any
+    error: str
+
+
+def _get_item_id(item) -> str:
+    # S3 file records are identified by their key, anything else by its repr
+    if isinstance(item, dict) and "Key" in item:
+        return item["Key"]
+    return repr(item)
+
+
+def _run_chunk(fn, chunk: list[tuple[str, any]]) -> list[TItemResult]:
+    # runs in the worker - a failed item doesn't stop the rest of the chunk
+    results = []
+    for item_id, item in chunk:
+        try:
+            results.append(
+                TItemResult(id=item_id, success=True, result=fn(item), error="")
+            )
+        except Exception as e:
+            results.append(
+                TItemResult(id=item_id, success=False, result=None, error=repr(e))
+            )
+    return results
+
+
+class _Checkpoint:
+    """
+    Ids of the items that have been processed successfully, saved to `config.paths.working/pipelines` so an
+    interrupted run can skip them when it is resumed.
+    """
+
+    def __init__(self, name: str, save_interval: float):
+        folder = create_dir_if_not_exist(config.get_path("working", "pipelines"))
+        self.path = os.path.join(folder, f"{sanitize_filename(name)}.json")
+        self.save_interval = save_interval
+        self.done = set()
+        self._last_save = time.monotonic()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.done = set(json.load(f))
+            log.info(f"Resuming from checkpoint - {len(self.done)} items already done")
+
+    def add(self, item_id: str):
+        self.done.add(item_id)
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(list(self.done), f)
+        os.replace(f"{self.path}.tmp", self.path)
+        self._last_save = time.monotonic()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _Progress:
+    def __init__(self, name: str, total: int, interval: float):
+        self.name = name
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        # items skipped because a previous run already processed them - not part of this run's rate
+        self.resumed = 0
+        self._start = time.monotonic()
+        self._last_log = self._start
+
+    def skip(self):
+        self.resumed += 1
+
+    def update(self, results: list[TItemResult]):
+        self.done += len(results)
+        self.failed += sum(not r["success"] for r in results)
+        if time.monotonic() - self._last_log >= self.interval:
+            self.log()
+
+    def format(self) -> str:
+        _seconds = self._last_log - self._start
+        _rate = self.done / max(_seconds, 1e-9)
+        _done = self.resumed + self.done
+        _progress = f"{_done}/{self.total}" if self.total else f"{_done}"
+        _resumed = f"{self.resumed} resumed, " if self.resumed else ""
+        _eta = (
+            f", ~{(self.total - _done) / _rate:.0f}s left"
+            if self.total and _rate
+            else ""
+        )
+        return f"{self.name} :: {_progress} items ({_resumed}{self.failed} failed) - {_rate:.1f} items/s{_eta}"
+
+    def log(self):
+        self._last_log = time.monotonic()
+        log.info(self.format())
+
+
+def iter_pipeline(
+    fn,
+    items,
+    name: str = None,
+    executor: str = "process",
+    max_workers: int = None,
+    chunk_size: int = 1,
+    ordered: bool = True,
+    checkpoint: bool = False,
+    get_item_id=_get_item_id,
+    progress_interval: float = 10,
+):
+    """
+    Run `fn` over each work item (e.g. the S3 file records from `download_all_files_from_bucket`, or DynamoDB scan
+    segments) on a process or thread pool, yielding the results as they complete.
+
+    Items are sent to the workers in chunks of `chunk_size` (to cut the per-task overhead for small items), and
+    only a few chunks per worker are in flight at a time, so `items` can be a lazy/unbounded generator. A failed
+    item doesn't stop the run - its result has `success=False` & the error.
+
+    With `checkpoint=True`, the ids of the successful items are saved to `config.paths.working/pipelines/<name>.json`,
+    so if the run is interrupted, running it again skips the items that are already done. The checkpoint is
+    removed once every item has been processed successfully.
+
+    :param fn: Function called with each item - must be picklable (i.e. defined at module level) for processes
+    :param items: Iterable of work items
+    :param name: Name of the pipeline, used for the progress logs & checkpoint file (defaults to `fn`'s name)
+    :param executor: `process` (for CPU-bound work) or `thread` (for I/O-bound work)
+    :param max_workers: Number of workers (defaults to the number of CPUs)
+    :param chunk_size: Number of items sent to a worker at a time
+    :param ordered: Yield the results in the order of `items` (otherwise as soon as they complete)
+    :param checkpoint: Save progress, so an interrupted run can be resumed
+    :param get_item_id: Function returning a unique, stable id for an item (used for the checkpoint)
+    :param progress_interval: Seconds between progress logs
+    :return: Generator of `TItemResult`
+    """
+    name = name or fn.__name__
+    max_workers = max_workers or os.cpu_count() or 1
+    total = len(items) if hasattr(items, "__len__") else None
+    _checkpoint = _Checkpoint(name, progress_interval) if checkpoint else None
+    progress = _Progress(name, total, progress_interval)
+
+    def _is_done(item_id: str):
+        if item_id in _checkpoint.done:
+            progress.skip()
+            return True
+        return False
+
+    def _iter_chunks():
+        _items = ((get_item_id(item), item) for item in items)
+        if _checkpoint is not None:
+            _items = (i for i in _items if not _is_done(i[0]))
+        while chunk := list(itertools.islice(_items, chunk_size)):
+            yield chunk
+
+    def _complete(future):
+        results = future.result()
+        progress.update(results)
+        for r in results:
+            if not r["success"]:
+                log.error(f"{name} :: Failed - {r['id']} - {r['error']}")
+            elif _checkpoint is not None:
+                _checkpoint.add(r["id"])
+        return results
+
+    # cap the number of in-flight chunks so memory doesn't grow with the number of items
+    max_pending = max_workers * 2
+    _pool = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    pool = _pool(max_workers=max_workers)
+    try:
+        pending = collections.deque() if ordered else set()
+        for chunk in _iter_chunks():
+            future = pool.submit(_run_chunk, fn, chunk)
+            if ordered:
+                pending.append(future)
+                if len(pending) >= max_pending:
+                    yield from _complete(pending.popleft())
+            else:
+                pending.add(future)
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from _complete(future)
+
+        while pending:
+            if ordered:
+                yield from _complete(pending.popleft())
+            else:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from _complete(future)
+    finally:
+        # if the run is interrupted (or the consumer stops early), don't start any more chunks
+        pool.shutdown(wait=True, cancel_futures=True)
+        if _checkpoint is not None:
+            _checkpoint.save()
+
+    progress.log()
+    # keep the checkpoint if any items failed, so running it again only retries those
+    if _checkpoint is not None and not progress.failed:
+        _checkpoint.remove()
+    _resumed = f", {progress.resumed} resumed" if progress.resumed else ""
+    log.success(
+        f"{name} :: {progress.done} items processed ({progress.failed} failed{_resumed})"
+    )
+
+
+def run_pipeline(fn, items, **kwargs) -> list[TItemResult]:
+    """
+    Run `fn` over each work item & collect the results, see `iter_pipeline`.
+    """
+    return list(iter_pipeline(fn, items, **kwargs))
@@ -0,0 +1,162 @@
+import cProfile
+import collections
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+from shared.config import config
+from shared.logging import getLogger
+from shared.utils import create_dir_if_not_exist
+from shared.utils.timestamp import get_file_friendly_timestamp
+
+log = getLogger(__name__)
+
+PROFILERS = ("cprofile", "sample", "memory")
+
+
+class _SamplingProfiler:
+    """
+    Low-overhead profiler that samples the stack of a thread every `interval` seconds, and counts the samples per
+    stack in the "folded" format used by flame graph tools (e.g. speedscope or `flamegraph.pl`).
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.01):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample, name="profiler-sample", daemon=True
+        )
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def to_folded(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.items())
+
+
+def _get_profilers(profile: str = None):
+    # `--profile=cprofile,memory` on the command line takes precedence over the `PROFILE` env variable
+    for arg in list(sys.argv[1:]):
+        if arg.startswith("--profile"):
+            sys.argv.remove(arg)
+            profile = arg.partition("=")[2] or "cprofile"
+    profile = profile if profile is not None else config.profile
+    if not profile:
+        return []
+    profilers = [p.strip() for p in profile.split(",")]
+    if "all" in profilers:
+        return list(PROFILERS)
+    for p in profilers:
+        if p not in PROFILERS:
+            log.warning(f"Unknown profiler `{p}` - expected one of {PROFILERS}")
+    return [p for p in profilers if p in PROFILERS]
+
+
+def _get_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS & in kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run(main, *args, name: str = None, profile: str = None, **kwargs):
+    """
+    Run a project's `main()`, optionally profiling it. The profilers are chosen with the `PROFILE` env variable
+    or a `--profile=...` command line flag (comma separated - `cprofile`, `sample`, `memory` or `all`), and the
+    reports are written to `config.paths.outputs/profiles`.
+
+    :param main: Function to run
+    :param name: Name used for the report files (defaults to the name of `main`'s project folder)
+    :param profile: Profilers to use (overrides the `PROFILE` env variable)
+    :return: Return value of `main`
+    """
+    profilers = _get_profilers(profile)
+    if not profilers:
+        return main(*args, **kwargs)
+
+    # name the reports after the project folder, e.g. `projects/example/main.py` -> `example`
+    _main_file = os.path.abspath(sys.modules[main.__module__].__file__)
+    name = name or os.path.basename(os.path.dirname(_main_file))
+    _folder = create_dir_if_not_exist(config.get_path("outputs", "profiles"))
+    _prefix = os.path.join(_folder, f"{name} {get_file_friendly_timestamp()}")
+    log.info(f"Profiling `{name}` with {', '.join(profilers)}")
+
+    profiler = cProfile.Profile() if "cprofile" in profilers else None
+    sampler = (
+        _SamplingProfiler(threading.get_ident(), config.profile_sample_interval)
+        if "sample" in profilers
+        else None
+    )
+    if "memory" in profilers:
+        tracemalloc.start(config.profile_memory_frames)
+    if sampler:
+        sampler.start()
+
+    _start = time.perf_counter()
+    try:
+        if profiler:
+            return profiler.runcall(main, *args, **kwargs)
+        return main(*args, **kwargs)
+    finally:
+        _seconds = time.perf_counter() - _start
+        summary = [f"Wall time: {_seconds:.3f}s"]
+        _peak_rss = _get_peak_rss_mb()
+        if _peak_rss is not None:
+            summary.append(f"Peak RSS: {_peak_rss:.1f} MB")
+
+        if sampler:
+            sampler.stop()
+            with open(f"{_prefix} sample.folded", "w", encoding="utf-8") as f:
+                f.write(sampler.to_folded())
+            summary.append(f"Samples: {sum(sampler.samples.values())}")
+
+        if profiler:
+            profiler.dump_stats(f"{_prefix} cprofile.prof")
+            _stats = io.StringIO()
+            pstats.Stats(profiler, stream=_stats).sort_stats("cumulative").print_stats(
+                50
+            )
+            with open(f"{_prefix} cprofile.txt", "w", encoding="utf-8") as f:
+                f.write(_stats.getvalue())
+
+        if "memory" in profilers:
+            snapshot = tracemalloc.take_snapshot()
+            _current, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            summary.append(f"Peak traced memory: {_peak / (1024 * 1024):.1f} MB")
+            with open(f"{_prefix} memory.txt", "w", encoding="utf-8") as f:
+                f.write(
+                    f"Current: {_current / (1024 * 1024):.1f} MB, peak: {_peak / (1024 * 1024):.1f} MB\n\n"
+                )
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+
+        with open(f"{_prefix} summary.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(summary) + "\n")
+        log.success(f"Profile written - {_prefix} ({', '.join(summary)})")
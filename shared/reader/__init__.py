@@ -0,0 +1,208 @@
+import collections
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+FILE_FORMATS = ("csv", "jsonl")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+_PAGE_SIZE = mmap.ALLOCATIONGRANULARITY
+
+
+def _get_file_format(path: str, file_format: str = None) -> str:
+    file_format = file_format or _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if file_format not in FILE_FORMATS:
+        raise ValueError(
+            f"Unknown file format `{file_format}` for {path} - expected one of {FILE_FORMATS}"
+        )
+    return file_format
+
+
+def _open_mmap(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        # the mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_range(mm: mmap.mmap, start: int, end: int) -> bytes:
+    data = mm[start:end]
+    # `madvise` isn't available on Windows
+    if hasattr(mmap, "MADV_DONTNEED"):
+        # the pages have been copied out, so drop them from this process's memory - they're read back from the OS
+        # page cache if they're needed again
+        _start = start - start % _PAGE_SIZE
+        mm.madvise(mmap.MADV_DONTNEED, _start, end - _start)
+    return data
+
+
+def _parse(data: bytes, file_format: str, read_kwargs: dict):
+    import polars as pl
+
+    if file_format == "csv":
+        return pl.read_csv(data, **read_kwargs)
+    # `read_ndjson` can't select columns, so they're selected after parsing
+    read_kwargs = dict(read_kwargs)
+    columns = read_kwargs.pop("columns", None)
+    df = pl.read_ndjson(data, **read_kwargs)
+    return df if columns is None else df.select(columns)
+
+
+def _parse_range(mm: mmap.mmap, start: int, end: int, file_format: str, kwargs: dict):
+    return _parse(_read_range(mm, start, end), file_format, kwargs)
+
+
+def _parse_file_range(path: str, start: int, end: int, file_format: str, kwargs: dict):
+    # runs in a worker process - only the path & offsets are sent to it, it maps the file itself
+    mm = _open_mmap(path)
+    try:
+        return _parse_range(mm, start, end, file_format, kwargs)
+    finally:
+        mm.close()
+
+
+def iter_chunk_boundaries(path: str, chunk_size: int = 64 * 1024 * 1024):
+    """
+    Split a (CSV/JSONL) file into byte ranges of roughly `chunk_size`, each ending on a newline so no record is
+    split across chunks. The ranges can be parsed independently, e.g. by `iter_file_chunks` or handed to
+    `shared.pipeline.run_pipeline`. Records must not contain newlines (e.g. in quoted CSV values).
+
+    :param path: Path of the file
+    :param chunk_size: Target size of each chunk in bytes
+    :return: Generator of (start, end) byte offsets - the first chunk includes the CSV header (if any)
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return
+    mm = _open_mmap(path)
+    try:
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            yield start, end
+            start = end
+    finally:
+        mm.close()
+
+
+def _get_chunk_kwargs(mm: mmap.mmap, first, file_format: str, read_kwargs: dict):
+    # the chunks after the first are given its column names & types (otherwise each chunk would infer its own
+    # types & they couldn't be concatenated)
+    if file_format != "csv":
+        return read_kwargs | {"schema": first.schema}
+
+    # ... and they don't have a header, so the selected columns are given by their position in the first line (polars
+    # returns them in the order of the file, like the first chunk)
+    kwargs = read_kwargs | {
+        "has_header": False,
+        "new_columns": first.columns,
+        "dtypes": first.schema,
+    }
+    if read_kwargs.get("columns") is not None:
+        _line_kwargs = {
+            k: v for k, v in read_kwargs.items() if k not in ("columns", "new_columns")
+        }
+        _names = _parse(mm[: mm.find(b"\n") + 1], "csv", _line_kwargs).columns
+        kwargs["columns"] = sorted(_names.index(c) for c in read_kwargs["columns"])
+    return kwargs
+
+
+def iter_file_chunks(
+    path: str,
+    file_format: str = None,
+    columns: list[str] = None,
+    chunk_size: int = 64 * 1024 * 1024,
+    executor: str = "thread",
+    max_workers: int = None,
+    **read_kwargs,
+):
+    """
+    Read a large (e.g. downloaded to `config.paths.raw`) CSV/JSONL file as a series of Polars DataFrames, without
+    reading the whole file into memory.
+
+    The file is memory-mapped & split into newline-aligned chunks (see `iter_chunk_boundaries`), which are parsed
+    in parallel - on a thread pool (Polars releases the GIL while parsing) or on a process pool, where only the
+    byte offsets are sent to the workers. At most two chunks per worker are in memory at a time.
+
+    :param path: Path of the file
+    :param file_format: `csv` or `jsonl` (defaults to the file's extension)
+    :param columns: Names of the columns to read (defaults to all)
+    :param chunk_size: Size of each chunk in bytes
+    :param executor: `thread` or `process`
+    :param max_workers: Number of workers (defaults to the number of CPUs)
+    :param read_kwargs: Passed to `pl.read_csv` / `pl.read_ndjson`, e.g. `separator` or `dtypes`/`schema`
+    :return: Generator of DataFrames, in the order of the file
+    """
+    file_format = _get_file_format(path, file_format)
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = iter_chunk_boundaries(path, chunk_size)
+    first = next(chunks, None)
+    if first is None:
+        return
+
+    mm = _open_mmap(path)
+    if executor == "process":
+        # polars' thread pool doesn't survive a `fork`, so the workers are always spawned
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+        def _submit(start: int, end: int, kwargs: dict):
+            return pool.submit(_parse_file_range, path, start, end, file_format, kwargs)
+
+    else:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+
+        def _submit(start: int, end: int, kwargs: dict):
+            return pool.submit(_parse_range, mm, start, end, file_format, kwargs)
+
+    try:
+        # the first chunk is parsed on its own, to get the header & schema for the rest
+        read_kwargs["columns"] = columns
+        df = _parse_range(mm, *first, file_format, read_kwargs)
+        # a chunk with just the CSV header has no types to go on, so it's merged with the next one
+        while not df.height and (_next := next(chunks, None)):
+            first = first[0], _next[1]
+            df = _parse_range(mm, *first, file_format, read_kwargs)
+        kwargs = _get_chunk_kwargs(mm, df, file_format, read_kwargs)
+        yield df
+
+        pending = collections.deque()
+        for start, end in chunks:
+            pending.append(_submit(start, end, kwargs))
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        mm.close()
+
+
+def read_file(path: str, file_format: str = None, columns: list[str] = None, **kwargs):
+    """
+    Read a large CSV/JSONL file into a single Polars DataFrame, parsing it in parallel chunks - see
+    `iter_file_chunks`.
+    """
+    import polars as pl
+
+    frames = list(iter_file_chunks(path, file_format, columns, **kwargs))
+    if not frames:
+        return pl.DataFrame()
+    return pl.concat(frames, rechunk=False)
+
+
+def scan_file(path: str, file_format: str = None, **scan_kwargs):
+    """
+    Lazily scan a CSV/JSONL file with Polars' own (parallel, streaming) reader, so only the columns & rows that
+    are used are read - e.g. `scan_file(path).filter(...).select(...).collect(streaming=True)`. Unlike
+    `iter_file_chunks`, this handles newlines within quoted CSV values.
+
+    :param scan_kwargs: Passed to `pl.scan_csv` / `pl.scan_ndjson`
+    :return: LazyFrame
+    """
+    import polars as pl
+
+    if _get_file_format(path, file_format) == "csv":
+        return pl.scan_csv(path, **scan_kwargs)
+    return pl.scan_ndjson(path, **scan_kwargs)
@@ -0,0 +1,106 @@
+"""
+Benchmark of `shared.reader` against reading the whole file into memory with `open().read()`, e.g.
+
+    python -m shared.reader.benchmark path/to/file.csv
+    python -m shared.reader.benchmark --rows 10000000
+
+Each method (& generating the file) is run in a fresh process, so the peak RSS of one doesn't hide the others'.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from shared.config import config
+from shared.logging import getLogger
+from shared.profiling import _get_peak_rss_mb
+from shared.reader import _get_file_format, _parse, iter_file_chunks, read_file
+from shared.utils import create_dir_if_not_exist
+
+log = getLogger(__name__)
+
+
+def _read_naive(path: str):
+    with open(path, "rb") as f:
+        data = f.read()
+    return _parse(data, _get_file_format(path), {}).height
+
+
+def _read_threads(path: str):
+    return read_file(path).height
+
+
+def _read_processes(path: str):
+    return read_file(path, executor="process").height
+
+
+def _iter_chunks(path: str):
+    # bounded memory - each chunk is dropped once it has been counted
+    return sum(df.height for df in iter_file_chunks(path))
+
+
+METHODS = {
+    "open().read()": _read_naive,
+    "read_file (threads)": _read_threads,
+    "read_file (processes)": _read_processes,
+    "iter_file_chunks": _iter_chunks,
+}
+
+
+def _run(method: str, path: str):
+    _start = time.perf_counter()
+    rows = METHODS[method](path)
+    return rows, time.perf_counter() - _start, _get_peak_rss_mb()
+
+
+def _create_file(rows: int) -> str:
+    import numpy as np
+    import polars as pl
+
+    path = os.path.join(
+        create_dir_if_not_exist(config.get_path("working", "benchmarks")),
+        f"reader {rows}.csv",
+    )
+    if not os.path.exists(path):
+        rng = np.random.default_rng(0)
+        pl.DataFrame(
+            {
+                "id": np.arange(rows),
+                "value": rng.random(rows),
+                "count": rng.integers(0, 1000, rows),
+                "name": rng.choice(["alpha", "beta", "gamma", "delta"], rows),
+            }
+        ).write_csv(path)
+    return path
+
+
+def _run_in_process(fn, *args):
+    # the peak RSS is inherited by child processes, so this one has to stay small
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", help="CSV/JSONL file to read")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=5_000_000,
+        help="Rows of the generated CSV file, if no path is given",
+    )
+    args = parser.parse_args()
+    path = args.path or _run_in_process(_create_file, args.rows)
+    log.info(f"Benchmarking {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+
+    for method in METHODS:
+        rows, seconds, peak_rss = _run_in_process(_run, method, path)
+        _peak_rss = f", peak RSS: {peak_rss:.1f} MB" if peak_rss is not None else ""
+        log.info(f"{method:<22} :: {rows} rows in {seconds:.3f}s{_peak_rss}")
+
+
+if __name__ == "__main__":
+    main()
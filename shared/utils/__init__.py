@@ -16,3 +16,86 @@ def get_nonnull_attr(d: dict, key: str, default_value=""):
 
 def use_value(d: any, default_value=""):
     return d if d is not None else default_value
+
+
+# %% Columnar versions - for a whole batch of records (e.g. DynamoDB items) at once, as Polars columns
+def _to_series(name: str, values: list):
+    import polars as pl
+
+    # polars silently turns values that don't match the first value's type into nulls, so mixed types are rejected
+    # (ints & floats are fine - they're stored as floats)
+    types = {type(v) for v in values if v is not None}
+    if len(types) > 1 and types != {int, float}:
+        _types = ", ".join(sorted(t.__name__ for t in types))
+        raise TypeError(
+            f"`{name}` has values of different types ({_types}) - use a default of the same type as the values"
+        )
+    return pl.Series(name, values)
+
+
+def _get_attrs(records, keys, default_value, nonnull: bool):
+    import polars as pl
+
+    defaults = keys if isinstance(keys, dict) else dict.fromkeys(keys, default_value)
+    if not isinstance(records, pl.DataFrame):
+        # pulling just the keys out of the dicts is much quicker than converting the whole records (`from_dicts`)
+        columns = []
+        for key, default in defaults.items():
+            if nonnull:
+                values = [
+                    v if (v := d.get(key)) is not None else default for d in records
+                ]
+            else:
+                values = [d[key] if key in d else default for d in records]
+            columns.append(_to_series(key, values))
+        return pl.DataFrame(columns)
+
+    columns = []
+    for key, default in defaults.items():
+        if key not in records.columns:
+            columns.append(pl.repeat(default, records.height, eager=True).alias(key))
+        elif nonnull:
+            columns.append(use_values(pl.col(key), default).alias(key))
+        else:
+            columns.append(pl.col(key))
+    return records.select(columns)
+
+
+def get_attrs(records, keys: list[str] | dict, default_value=""):
+    """
+    Columnar `get_attr` - get `keys` from a list of dicts or a Polars DataFrame, as columns.
+
+    For a list of dicts, each missing key gets the default (exactly like `get_attr`), and a `TypeError` is raised if
+    a key has values of different types (which includes a default of a different type to the values). A DataFrame
+    can't tell a missing value from a null, so only the columns that aren't in the frame get the default.
+
+    :param records: List of dicts or a DataFrame
+    :param keys: Keys to get, or a dict of the keys & their default values
+    :param default_value: Default value for the keys that aren't in `keys`' dict
+    :return: DataFrame with a column per key
+    """
+    return _get_attrs(records, keys, default_value, nonnull=False)
+
+
+def get_nonnull_attrs(records, keys: list[str] | dict, default_value=""):
+    """
+    Columnar `get_nonnull_attr` - like `get_attrs`, but null values are replaced by the default too.
+    """
+    return _get_attrs(records, keys, default_value, nonnull=True)
+
+
+def use_values(values, default_value=""):
+    """
+    Columnar `use_value`.
+
+    :param values: Polars expression/Series
+    :return: Expression/Series with the null values replaced by `default_value`
+    """
+    import polars as pl
+
+    # `coalesce` (rather than `fill_null`) casts to a common type when the default's type doesn't match the values'
+    if isinstance(values, pl.Series):
+        return (
+            values.to_frame().select(use_values(pl.first(), default_value)).to_series()
+        )
+    return pl.coalesce(values, pl.lit(default_value))
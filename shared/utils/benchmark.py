@@ -0,0 +1,122 @@
+"""
+Benchmark of the columnar date functions in `shared.utils.date` against applying their scalar versions row by row
+with `map_elements`, e.g.
+
+    python -m shared.utils.benchmark
+    python -m shared.utils.benchmark --rows 5000000 --repeat 3
+
+The best of `--repeat` runs of each is logged.
+"""
+import argparse
+import time
+
+from shared.logging import getLogger
+from shared.utils import date
+
+log = getLogger(__name__)
+
+
+def _map_pairs(fn):
+    import polars as pl
+
+    def _run(df):
+        return df.select(
+            pl.struct("start", "end").map_elements(lambda r: fn(r["start"], r["end"]))
+        )
+
+    return _run
+
+
+def _map_timestamps(column: str, unit: str):
+    import polars as pl
+
+    def _run(df):
+        return df.select(
+            pl.col(column).map_elements(
+                lambda v: date.convert_timestamp_to_datetime(v, unit)
+            )
+        )
+
+    return _run
+
+
+def _get_functions():
+    # (scalar, columnar) per function - each taking the benchmark DataFrame
+    return {
+        "convert_timestamp (s)": (
+            _map_timestamps("seconds", "s"),
+            lambda df: date.convert_timestamps_to_datetimes(df["seconds"], "s"),
+        ),
+        "convert_timestamp (nano)": (
+            _map_timestamps("nanoseconds", "nano"),
+            lambda df: date.convert_timestamps_to_datetimes(df["nanoseconds"], "nano"),
+        ),
+        "days_diff": (
+            _map_pairs(date.days_diff),
+            lambda df: date.days_diffs(df["start"], df["end"]),
+        ),
+        "date_diff": (
+            _map_pairs(date.date_diff),
+            lambda df: date.date_diffs(df["start"], df["end"]),
+        ),
+        "hours_diff": (
+            _map_pairs(date.hours_diff),
+            lambda df: date.hours_diffs(df["start"], df["end"]),
+        ),
+        "working_hours_difference": (
+            _map_pairs(date.working_hours_difference),
+            lambda df: date.working_hours_differences(df["start"], df["end"]),
+        ),
+    }
+
+
+def _create_frame(rows: int):
+    import numpy as np
+    import polars as pl
+
+    rng = np.random.default_rng(0)
+    # timestamps between 2020 & 2025
+    seconds = rng.uniform(1.58e9, 1.74e9, rows)
+    start = (seconds * 1e6).astype("datetime64[us]")
+    end = start + rng.integers(0, 400 * 24 * 3600 * 10**6, rows).astype(
+        "timedelta64[us]"
+    )
+    return pl.DataFrame(
+        {
+            "seconds": seconds,
+            "nanoseconds": (seconds * 1e9).astype("int64"),
+            "start": start,
+            "end": end,
+        }
+    )
+
+
+def _time(fn, df, repeat: int) -> float:
+    seconds = float("inf")
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        fn(df)
+        seconds = min(seconds, time.perf_counter() - _start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of rows")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each version")
+    args = parser.parse_args()
+
+    df = _create_frame(args.rows)
+    log.info(f"Benchmarking {args.rows} rows (best of {args.repeat})")
+    for name, (scalar, columnar) in _get_functions().items():
+        scalar_seconds = _time(scalar, df, args.repeat)
+        columnar_seconds = _time(columnar, df, args.repeat)
+        log.info(
+            f"{name:<26} :: scalar {args.rows / scalar_seconds:>12,.0f} rows/s, "
+            f"columnar {args.rows / columnar_seconds:>12,.0f} rows/s "
+            f"({scalar_seconds / columnar_seconds:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
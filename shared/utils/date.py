@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 UNITS = {
     "s": 1,
@@ -30,71 +30,259 @@ def hours_diff(start_datetime: datetime, end_datetime: datetime):
     return total_seconds / 3600
 
 
+# %% Columnar versions - work on Polars expressions/Series & NumPy arrays without a python loop per value
+def _as_polars(values):
+    import polars as pl
+
+    # NumPy arrays are wrapped (without copying) in a Series, so the same expressions work for all of them
+    return values if isinstance(values, (pl.Expr, pl.Series)) else pl.Series(values)
+
+
+def _as_output(result, values):
+    import numpy as np
+
+    return result.to_numpy() if isinstance(values, np.ndarray) else result
+
+
+def _to_microseconds(values):
+    import polars as pl
+
+    return _as_polars(values).dt.epoch("us").cast(pl.Int64)
+
+
+def convert_timestamps_to_datetimes(values, unit="s", time_zone: str = None):
+    """
+    Columnar `convert_timestamp_to_datetime`.
+
+    Unlike the scalar version (which returns the machine's local time), the datetimes are in UTC, or converted
+    to `time_zone` if one is given.
+
+    :param values: Timestamps - a Polars expression/Series or NumPy array
+    :param unit: Unit of the timestamps, one of `UNITS`
+    :param time_zone: Time zone to convert the datetimes to, e.g. `Europe/London`
+    :return: Datetimes, of the same kind as `values`
+    """
+    import polars as pl
+
+    _values = _as_polars(values)
+    if unit == "nano":
+        # nanosecond timestamps don't fit in a float without losing precision
+        result = pl.from_epoch(_values.cast(pl.Int64), "ns")
+    else:
+        # split off the whole seconds before rounding the fraction to microseconds, like `datetime.fromtimestamp`
+        seconds = _values.cast(pl.Float64) / UNITS[unit]
+        whole_seconds = seconds.floor()
+        result = pl.from_epoch(
+            whole_seconds.cast(pl.Int64) * 1_000_000
+            + ((seconds - whole_seconds) * 1e6).round(0).cast(pl.Int64),
+            "us",
+        )
+    if time_zone:
+        result = result.dt.replace_time_zone("UTC").dt.convert_time_zone(time_zone)
+    return _as_output(result, values)
+
+
+def convert_nanoseconds_to_datetimes(values, time_zone: str = None):
+    return convert_timestamps_to_datetimes(values, "nano", time_zone)
+
+
+def days_diffs(start_datetimes, end_datetimes):
+    """Columnar `days_diff` - the number of whole days between each pair of datetimes (rounded down)."""
+    result = (_to_microseconds(end_datetimes) - _to_microseconds(start_datetimes)) // (
+        24 * 60 * 60 * 1_000_000
+    )
+    return _as_output(result, start_datetimes)
+
+
+def date_diffs(start_datetimes, end_datetimes):
+    """Columnar `date_diff` - the number of calendar days between the dates of each pair of datetimes."""
+    import polars as pl
+
+    # dates are stored as days since the epoch. Time zone aware datetimes use their local date
+    result = _as_polars(end_datetimes).dt.date().cast(pl.Int32) - _as_polars(
+        start_datetimes
+    ).dt.date().cast(pl.Int32)
+    return _as_output(result, start_datetimes)
+
+
+def hours_diffs(start_datetimes, end_datetimes):
+    """Columnar `hours_diff` - the hours between each pair of datetimes (counting whole seconds)."""
+    result = (
+        (_to_microseconds(end_datetimes) - _to_microseconds(start_datetimes))
+        // 1_000_000
+    ) / 3600
+    return _as_output(result, start_datetimes)
+
+
+def _count_working_days(start: date, end: date, holidays: set[date]) -> int:
+    # number of weekdays in [start, end) that aren't holidays - whole weeks, then the (at most 6) remaining days
+    days = (end - start).days
+    if days <= 0:
+        return 0
+    weeks, remainder = divmod(days, 7)
+    count = weeks * 5 + sum(
+        1 for i in range(remainder) if (start.weekday() + i) % 7 < 5
+    )
+    return count - sum(1 for h in holidays if start <= h < end and h.weekday() < 5)
+
+
 def working_hours_difference(
-    start_date: datetime, end_date: datetime, working_hour_start=9, working_hour_end=17
+    start_date: datetime,
+    end_date: datetime,
+    working_hour_start: float = 9,
+    working_hour_end: float = 17,
+    holidays=(),
 ) -> float:
     """
     Calculate the difference between two dates in working hours.
 
+    The start day counts from `start_date` to the end of the working day, the end day from the start of the
+    working day to `end_date`, and each working day in between counts in full. If both dates are on the same
+    day, only the start day is counted.
+
     :param start_date: Start date
     :param end_date: End date
-    :param working_hour_start: Starting hour of the normal working day (e.g. 9am -> 9)
-    :param working_hour_end: Ending hour of the normal working day (e.g. 5pm -> 17)
+    :param working_hour_start: Starting hour of the normal working day (e.g. 9am -> 9, 8:30am -> 8.5)
+    :param working_hour_end: Ending hour of the normal working day (e.g. 5pm -> 17, 5:45pm -> 17.75)
+    :param holidays: Dates (besides weekends) that aren't working days
     :return: Difference in working hours
     """
+    start_day, end_day = start_date.date(), end_date.date()
+    if end_day < start_day:
+        return 0
 
-    # Define working hours
-    work_start_time = datetime.time(
-        datetime(2000, 1, 1, working_hour_start)
-    )  # Arbitrary date just to get the time
-    work_end_time = datetime.time(
-        datetime(2000, 1, 1, working_hour_end)
-    )  # Arbitrary date just to get the time
+    holidays = {h.date() if isinstance(h, datetime) else h for h in holidays}
+    work_start = timedelta(hours=working_hour_start)
+    work_end = timedelta(hours=working_hour_end)
     work_hours_per_day = abs(working_hour_end - working_hour_start)
 
-    # Calculate the total working hours between the two dates
+    def _is_working_day(day: date):
+        return day.weekday() < 5 and day not in holidays
+
     total_hours = 0
 
-    # Increment the start date until it reaches the end date
-    current_date = start_date
-
-    while current_date.date() <= end_date.date():
-        # If the current date is a weekday
-        if current_date.weekday() < 5:
-            # If the current date is the start date
-            if current_date.date() == start_date.date():
-                # Calculate working hours for the start day
-                work_end_today = datetime(
-                    current_date.year,
-                    current_date.month,
-                    current_date.day,
-                    work_end_time.hour,
-                )
-                if current_date.time() > work_end_time:
-                    pass  # start time is after working hours
-                elif current_date.time() <= work_start_time:
-                    total_hours += work_hours_per_day
-                else:
-                    total_hours += (work_end_today - current_date).seconds / 3600
-            # If the current date is the end date
-            elif current_date.date() == end_date.date():
-                # Calculate working hours for the end day
-                work_start_today = datetime(
-                    current_date.year,
-                    current_date.month,
-                    current_date.day,
-                    work_start_time.hour,
-                )
-                if end_date.time() < work_start_time:
-                    pass  # end time is before working hours
-                elif end_date.time() >= work_end_time:
-                    total_hours += work_hours_per_day
-                else:
-                    total_hours += (end_date - work_start_today).seconds / 3600.0
-            # If the current date is a day between the start and end dates
-            else:
-                total_hours += work_hours_per_day
-        # Move to the next day
-        current_date += timedelta(days=1)
+    # Calculate working hours for the start day
+    if _is_working_day(start_day):
+        start_time = start_date - start_date.replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if start_time > work_end:
+            pass  # start time is after working hours
+        elif start_time <= work_start:
+            total_hours += work_hours_per_day
+        else:
+            total_hours += (work_end - start_time).seconds / 3600
+
+    if end_day == start_day:
+        return total_hours
+
+    # Calculate working hours for the end day
+    if _is_working_day(end_day):
+        end_time = end_date - end_date.replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if end_time < work_start:
+            pass  # end time is before working hours
+        elif end_time >= work_end:
+            total_hours += work_hours_per_day
+        else:
+            total_hours += (end_time - work_start).seconds / 3600
+
+    # The days between the start and end dates count in full
+    total_hours += work_hours_per_day * _count_working_days(
+        start_day + timedelta(days=1), end_day, holidays
+    )
+    return total_hours
+
+
+def _to_datetime64(values):
+    import numpy as np
+
+    if not isinstance(values, np.ndarray):
+        import polars as pl
+
+        values = pl.Series(values)
+        if values.dtype == pl.Datetime and values.dtype.time_zone is not None:
+            # working hours are in wall-clock time, so drop the timezone rather than converting to UTC
+            values = values.dt.replace_time_zone(None)
+        values = values.to_numpy()
+    return values.astype("datetime64[us]")
+
+
+def working_hours_differences(
+    start_dates,
+    end_dates,
+    working_hour_start: float = 9,
+    working_hour_end: float = 17,
+    holidays=(),
+):
+    """
+    Vectorised `working_hours_difference` - calculate the working hours between each pair of dates.
+
+    :param start_dates: Start dates (Polars Series, NumPy `datetime64` array or list of datetimes)
+    :param end_dates: End dates, the same length as `start_dates`
+    :param working_hour_start: Starting hour of the normal working day (e.g. 9am -> 9, 8:30am -> 8.5)
+    :param working_hour_end: Ending hour of the normal working day (e.g. 5pm -> 17, 5:45pm -> 17.75)
+    :param holidays: Dates (besides weekends) that aren't working days
+    :return: Differences in working hours - a Polars Series if `start_dates` is a Polars Series, otherwise a
+        NumPy array (with nulls / `NaN` where either date is missing)
+    """
+    import numpy as np
+
+    start = _to_datetime64(start_dates)
+    end = _to_datetime64(end_dates)
+    missing = np.isnat(start) | np.isnat(end)
+    start = np.where(missing, np.datetime64(0, "us"), start)
+    end = np.where(missing, np.datetime64(0, "us"), end)
+
+    holidays = np.array(
+        [h.date() if isinstance(h, datetime) else h for h in holidays],
+        dtype="datetime64[D]",
+    )
+    work_start = np.timedelta64(round(working_hour_start * 3600e6), "us")
+    work_end = np.timedelta64(round(working_hour_end * 3600e6), "us")
+    work_hours_per_day = abs(working_hour_end - working_hour_start)
+    second = np.timedelta64(1, "s")
+
+    start_day = start.astype("datetime64[D]")
+    end_day = end.astype("datetime64[D]")
+    start_time = start - start_day
+    end_time = end - end_day
+
+    # partial days are counted in whole seconds, like `working_hours_difference`
+    start_hours = np.where(
+        start_time > work_end,
+        0,
+        np.where(
+            start_time <= work_start,
+            work_hours_per_day,
+            ((work_end - start_time) // second) / 3600,
+        ),
+    ) * np.is_busday(start_day, holidays=holidays)
+    end_hours = np.where(
+        end_time < work_start,
+        0,
+        np.where(
+            end_time >= work_end,
+            work_hours_per_day,
+            ((end_time - work_start) // second) / 3600,
+        ),
+    ) * np.is_busday(end_day, holidays=holidays)
+    between_days = np.busday_count(
+        start_day + 1, np.maximum(end_day, start_day + 1), holidays=holidays
+    )
+
+    total_hours = np.where(
+        end_day > start_day,
+        start_hours + end_hours + work_hours_per_day * between_days,
+        np.where(end_day == start_day, start_hours, 0),
+    ).astype("float64")
+    total_hours[missing] = np.nan
+
+    if type(start_dates).__module__.startswith("polars"):
+        import polars as pl
 
+        return pl.Series(
+            getattr(start_dates, "name", ""), total_hours, nan_to_null=True
+        )
     return total_hours
@@ -1,3 +1,6 @@
+import functools
+import re
+
 from shared.logging import getLogger
 
 logger = getLogger(__name__)
@@ -13,12 +16,53 @@ def sanitize_filename(
     return sanitized_filename
 
 
+def sanitize_filenames(
+    filenames: list[str],
+    replacement_text="_",
+    invalid_characters=_INVALID_FILENAME_CHARACTERS,
+):
+    return [_sanitize(f, replacement_text, invalid_characters) for f in filenames]
+
+
 def sanitize_folder_path(
     folder_path: str,
     replacement_text="_",
     invalid_characters=_INVALID_CHARACTERS,
     folder_seperator="\\",
     max_folder_length=255,
+):
+    # deep S3 prefixes mean the same few folders come up for most files, so the results are memoised
+    return _sanitize_folder_path(
+        folder_path,
+        replacement_text,
+        invalid_characters,
+        folder_seperator,
+        max_folder_length,
+    )
+
+
+def sanitize_folder_paths(
+    folder_paths: list[str],
+    replacement_text="_",
+    invalid_characters=_INVALID_CHARACTERS,
+    folder_seperator="\\",
+    max_folder_length=255,
+):
+    return [
+        _sanitize_folder_path(
+            p, replacement_text, invalid_characters, folder_seperator, max_folder_length
+        )
+        for p in folder_paths
+    ]
+
+
+@functools.lru_cache(maxsize=4096)
+def _sanitize_folder_path(
+    folder_path: str,
+    replacement_text: str,
+    invalid_characters: str,
+    folder_seperator: str,
+    max_folder_length: int,
 ):
     # standardise all slashes to one style
     path_parts = folder_path.replace("\\", "/").split("/")
@@ -55,13 +99,27 @@ def _check_root_path(path: str):
         return True
 
 
+@functools.lru_cache(maxsize=None)
+def _get_invalid_pattern(invalid_characters: str):
+    if not invalid_characters:
+        return re.compile("(?!)")  # never matches
+    return re.compile(f"[{re.escape(invalid_characters)}]")
+
+
 def _sanitize(value: str, replacement_text="_", invalid_characters=_INVALID_CHARACTERS):
-    # TODO: should probably be done with regex (re), but this was easier...
     sanitized = value
-    for ch in invalid_characters:
-        if ch in sanitized:
-            sanitized = sanitized.replace(ch, replacement_text)
-    # sanitized = "".join([replacement_text if c in invalid_characters else c for c in value])
+    # most values are already valid, which a single (precompiled) regex scan finds faster than checking for each
+    # character. Otherwise replacing each character with `str.replace` is still faster than `re.sub`/`translate`
+    pattern = _get_invalid_pattern(invalid_characters)
+    if pattern.search(sanitized) is not None:
+        if pattern.search(replacement_text) is not None:
+            # each invalid character is replaced once - replacing them one after the other would also replace
+            # the invalid characters in the replacements (& `sanitize_expr` does it in a single pass)
+            sanitized = pattern.sub(lambda _: replacement_text, sanitized)
+        else:
+            for ch in invalid_characters:
+                if ch in sanitized:
+                    sanitized = sanitized.replace(ch, replacement_text)
 
     # max file/folder length for Windows
     sanitized = sanitized[:255]
@@ -72,5 +130,39 @@ def _sanitize(value: str, replacement_text="_", invalid_characters=_INVALID_CHAR
     return sanitized
 
 
+# %% Columnar versions - native Polars expressions, for sanitizing a whole column at once
+def _get_polars_pattern(invalid_characters: str):
+    # Rust regex escapes differ from python's, so each character is given by its code point
+    return "[" + "".join(f"\\x{{{ord(ch):X}}}" for ch in invalid_characters) + "]"
+
+
+def sanitize_expr(values, replacement_text="_", invalid_characters=_INVALID_CHARACTERS):
+    """
+    Columnar `_sanitize` (the rules used for filenames & each folder in a path), with the same output.
+
+    :param values: Polars expression/Series of strings, or the name of a column
+    :return: Expression/Series of the sanitized strings
+    """
+    import polars as pl
+
+    values = pl.col(values) if isinstance(values, str) else values
+    if invalid_characters:
+        # `$` is special in the replacement of a regex
+        values = values.str.replace_all(
+            _get_polars_pattern(invalid_characters), replacement_text.replace("$", "$$")
+        )
+    # max file/folder length for Windows & no trailing spaces or periods
+    return values.str.slice(0, 255).str.rstrip(" .")
+
+
+def sanitize_filename_expr(
+    values, replacement_text="_", invalid_characters=_INVALID_FILENAME_CHARACTERS
+):
+    """
+    Columnar `sanitize_filename`, e.g. `df.with_columns(sanitize_filename_expr("filename"))`.
+    """
+    return sanitize_expr(values, replacement_text, invalid_characters)
+
+
 def replace_line_breaks(string):
     return string.replace("\n", " ")
@@ -0,0 +1,38 @@
+import pytest
+
+REGION = "eu-west-1"
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """
+    Local stand-in for AWS (moto) - clients created within the test talk to it instead of AWS.
+    """
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    with moto.mock_aws():
+        yield
+
+
+@pytest.fixture
+def s3_client(aws):
+    import boto3
+
+    return boto3.client("s3", region_name=REGION)
+
+
+@pytest.fixture
+def dynamodb_client(aws):
+    import boto3
+
+    return boto3.client("dynamodb", region_name=REGION)
+
+
+@pytest.fixture
+def cognito_client(aws):
+    import boto3
+
+    return boto3.client("cognito-idp", region_name=REGION)
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from lib.aws import aio
+
+
+@pytest.fixture
+def bucket(s3_client):
+    s3_client.create_bucket(
+        Bucket="bucket",
+        CreateBucketConfiguration={"LocationConstraint": s3_client.meta.region_name},
+    )
+    for i in range(20):
+        s3_client.put_object(
+            Bucket="bucket",
+            Key=f"folder/sub/file-{i}.txt",
+            Body=f"content {i}".encode(),
+            Metadata={"index": str(i)},
+        )
+    # empty objects (e.g. folder markers) are skipped
+    s3_client.put_object(Bucket="bucket", Key="folder/", Body=b"")
+    return "bucket"
+
+
+@pytest.fixture
+def table(dynamodb_client):
+    dynamodb_client.create_table(
+        TableName="table",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    for i in range(200):
+        dynamodb_client.put_item(
+            TableName="table",
+            Item={"pk": {"S": f"item-{i}"}, "n": {"N": str(i)}},
+        )
+    return "table"
+
+
+def test_list_files_in_bucket(s3_client, bucket):
+    files = asyncio.run(aio.list_files_in_bucket(bucket, s3_client=s3_client))
+
+    assert len(files) == 20
+    assert {f["meta"]["filename"] for f in files} == {
+        f"file-{i}.txt" for i in range(20)
+    }
+    assert all(f["meta"]["subfolders"] == ["folder", "sub"] for f in files)
+    assert all(f["meta"]["filename"] == f"file-{f['meta']['index']}.txt" for f in files)
+
+
+def test_download_files_from_bucket(s3_client, bucket, tmp_path, monkeypatch):
+    # the paths are joined with `\\`, which is part of the file name (relative to the cwd) outside of Windows
+    monkeypatch.chdir(tmp_path)
+
+    async def _download():
+        files = await aio.list_files_in_bucket(bucket, s3_client=s3_client)
+        return await aio.download_files_from_bucket(
+            files, bucket, str(tmp_path), s3_client=s3_client, max_concurrency=4
+        )
+
+    files = asyncio.run(_download())
+
+    for f in files:
+        path = f"{f['meta']['location']}\\{f['meta']['filename']}"
+        assert os.path.exists(path)
+        with open(path, "rb") as _f:
+            assert _f.read() == f"content {f['meta']['index']}".encode()
+
+
+@pytest.mark.parametrize(
+    "max_concurrency, max_inflight_bytes, expected", [(3, 10**6, 3), (8, 250, 2)]
+)
+def test_download_files_limits(
+    tmp_path, monkeypatch, max_concurrency, max_inflight_bytes, expected
+):
+    monkeypatch.chdir(tmp_path)
+    in_flight, peak = [], []
+
+    def _download_file(client, bucket_id, file, filepath, *args):
+        in_flight.append(file["Key"])
+        peak.append(len(in_flight))
+        time.sleep(0.02)
+        in_flight.remove(file["Key"])
+        return 0.02
+
+    monkeypatch.setattr(aio.s3, "_download_file", _download_file)
+    files = [
+        {
+            "Key": f"file-{i}",
+            "Size": 100,
+            "StorageClass": "STANDARD",
+            "meta": {"filename": f"file-{i}", "subfolders": []},
+        }
+        for i in range(20)
+    ]
+    asyncio.run(
+        aio.download_files_from_bucket(
+            files,
+            "bucket",
+            str(tmp_path),
+            s3_client=object(),
+            max_concurrency=max_concurrency,
+            max_inflight_bytes=max_inflight_bytes,
+        )
+    )
+
+    assert max(peak) == expected
+    assert all("location" in f["meta"] for f in files)
+
+
+def test_get_dynamodb_table_data(dynamodb_client, table):
+    items = asyncio.run(
+        aio.get_dynamodb_table_data(
+            table, dynamodb_client=dynamodb_client, total_segments=4, use_decimal=False
+        )
+    )
+
+    assert sorted(i["n"] for i in items) == list(range(200))
+
+
+def test_get_dynamodb_table_data_query(dynamodb_client, table):
+    items = asyncio.run(
+        aio.get_dynamodb_table_data(
+            table,
+            "pk = :pk",
+            dynamodb_client,
+            expression_attribute_values={":pk": "item-7"},
+            use_decimal=False,
+        )
+    )
+
+    assert items == [{"pk": "item-7", "n": 7}]
+
+
+def test_iter_dynamodb_table_pages_stopped_early(dynamodb_client, table):
+    # the segments that are blocked on a full buffer once the consumer stops must not be left pending
+    async def _stop_early():
+        pages = aio.iter_dynamodb_table_pages(
+            table,
+            dynamodb_client=dynamodb_client,
+            total_segments=4,
+            max_buffered_pages=1,
+        )
+        async for _ in pages:
+            break
+        await pages.aclose()
+        return [
+            t
+            for t in asyncio.all_tasks()
+            if t.get_coro().__name__ == "_scan_segment" and not t.done()
+        ]
+
+    assert asyncio.run(asyncio.wait_for(_stop_early(), timeout=10)) == []
+
+
+def test_list_users(cognito_client):
+    pool_id = cognito_client.create_user_pool(PoolName="pool")["UserPool"]["Id"]
+    for i in range(5):
+        cognito_client.admin_create_user(
+            UserPoolId=pool_id,
+            Username=f"user-{i}@example.com",
+            UserAttributes=[{"Name": "email", "Value": f"user-{i}@example.com"}],
+        )
+
+    async def _list():
+        streamed = [u async for u in aio.iter_users(pool_id, cognito_client)]
+        return streamed, (await aio.list_users(pool_id, cognito_client))["Users"]
+
+    streamed, users = asyncio.run(_list())
+
+    assert len(streamed) == len(users) == 5
+    assert {u["Username"] for u in users} == {f"user-{i}@example.com" for i in range(5)}
@@ -0,0 +1,38 @@
+from lib.aws import cognito
+
+
+class _StubPaginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **params):
+        return iter(self.pages)
+
+
+class _StubClient:
+    # not a botocore client - no `meta` or credentials
+    def get_paginator(self, name):
+        return _StubPaginator(
+            [{"Users": [{"Username": "a"}]}, {"Users": [{"Username": "b"}]}]
+        )
+
+
+def test_list_users_stub_client():
+    users = cognito.list_users("pool", _StubClient())
+    assert [u["Username"] for u in users["Users"]] == ["a", "b"]
+
+
+def test_list_users(cognito_client):
+    pool_id = cognito_client.create_user_pool(PoolName="pool")["UserPool"]["Id"]
+    for i in range(3):
+        cognito_client.admin_create_user(UserPoolId=pool_id, Username=f"user-{i}")
+
+    assert [p["Id"] for p in cognito.list_user_pools(cognito_client)["UserPools"]] == [
+        pool_id
+    ]
+    cognito.clear_users_cache()
+    users = cognito.list_users(pool_id, cognito_client, cache_ttl=60)
+    assert len(users["Users"]) == 3
+    # changing the result doesn't change the cached listing
+    users["Users"].clear()
+    assert len(cognito.list_users(pool_id, cognito_client, cache_ttl=60)["Users"]) == 3
@@ -0,0 +1,83 @@
+import pytest
+
+from lib.aws import dynamodb
+from lib.aws.client import get_client_key
+
+
+class _StubClient:
+    # not a botocore client - no `meta` or credentials
+    def __init__(self):
+        self.calls = 0
+
+    def describe_table(self, TableName):
+        self.calls += 1
+        return {"Table": {"TableName": TableName, "AttributeDefinitions": []}}
+
+
+def test_describe_stub_client():
+    client = _StubClient()
+    dynamodb.clear_dynamodb_cache()
+    assert dynamodb.describe_dynamodb_table("table", client)["TableName"] == "table"
+    assert dynamodb.describe_dynamodb_table("table", client, cache_ttl=60)
+    assert dynamodb.describe_dynamodb_table("table", client, cache_ttl=60)
+    assert client.calls == 2
+
+
+def test_client_key_by_region(dynamodb_client):
+    import boto3
+
+    other = boto3.client("dynamodb", region_name="us-east-1")
+    assert get_client_key(dynamodb_client) != get_client_key(other)
+    assert get_client_key(_StubClient())[:2] == (None, None)
+
+
+@pytest.fixture
+def table(dynamodb_client):
+    dynamodb_client.create_table(
+        TableName="table",
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return "table"
+
+
+def test_batch_write_duplicate_keys(dynamodb_client, table):
+    items = [{"pk": f"item-{i % 30}", "value": i} for i in range(60)]
+    result = dynamodb.batch_write(
+        table, items, delete_keys=[{"pk": "item-0"}], dynamodb_client=dynamodb_client
+    )
+    assert result["errors"] == [] and result["unprocessed"] == []
+    assert result["count"] == 30
+
+    data = dynamodb.get_dynamodb_table_data(table, dynamodb=dynamodb_client)
+    # the last put per key wins, & the delete comes after the puts
+    assert {d["pk"]: d["value"] for d in data} == {
+        f"item-{i}": i + 30 for i in range(1, 30)
+    }
+
+
+def test_batch_get_duplicate_keys(dynamodb_client, table):
+    dynamodb.batch_write(
+        table, [{"pk": f"item-{i}"} for i in range(10)], dynamodb_client=dynamodb_client
+    )
+    keys = [{"pk": f"item-{i % 10}"} for i in range(100)]
+    result = dynamodb.batch_get(table, keys, dynamodb_client=dynamodb_client)
+    assert result["errors"] == [] and result["unprocessed"] == []
+    assert sorted(i["pk"] for i in result["items"]) == [f"item-{i}" for i in range(10)]
+
+
+def test_export_rows_per_file(dynamodb_client, table, tmp_path):
+    pl = pytest.importorskip("polars")
+    dynamodb.batch_write(
+        table,
+        [{"pk": f"item-{i}", "value": i} for i in range(60)],
+        dynamodb_client=dynamodb_client,
+    )
+    files = dynamodb.export_dynamodb_table_to_parquet(
+        table, str(tmp_path), dynamodb=dynamodb_client, rows_per_file=25
+    )
+
+    assert [pl.read_parquet(f).height for f in files] == [25, 25, 10]
+    values = pl.concat([pl.read_parquet(f) for f in files])["value"].to_list()
+    assert sorted(values) == list(range(60))
@@ -0,0 +1,77 @@
+import pytest
+
+from lib.aws import s3
+from shared.cache import FileCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path / "cache"), 10**9)
+    monkeypatch.setattr(
+        s3,
+        "_get_cache",
+        lambda use_cache=None: cache if use_cache is not False else None,
+    )
+    return cache
+
+
+@pytest.fixture
+def bucket(s3_client):
+    s3_client.create_bucket(
+        Bucket="bucket",
+        CreateBucketConfiguration={"LocationConstraint": s3_client.meta.region_name},
+    )
+    return "bucket"
+
+
+def _count_calls(client, operation: str) -> list:
+    calls = []
+    client.meta.events.register(
+        f"before-call.s3.{operation}", lambda **_: calls.append(1)
+    )
+    return calls
+
+
+def test_read_range_from_cache_without_head_object(s3_client, bucket, cache):
+    data = bytes(range(256)) * 40
+    s3_client.put_object(Bucket=bucket, Key="data.bin", Body=data)
+    # a whole read fetches the object into the cache
+    assert s3.read_s3_object(bucket, "data.bin", s3_client) == data
+
+    head_calls = _count_calls(s3_client, "HeadObject")
+    get_calls = _count_calls(s3_client, "GetObject")
+    hits = cache.hits
+    assert (
+        s3.read_s3_object(
+            bucket, "data.bin", s3_client, byte_range=(100, 9000), part_size=1000
+        )
+        == data[100:9001]
+    )
+
+    assert head_calls == []
+    # only the first part is fetched, the rest is read from the cache
+    assert len(get_calls) == 1
+    assert cache.hits == hits + 1
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_scan_s3_object_read_kwargs(s3_client, bucket, cache, use_cache):
+    pl = pytest.importorskip("polars")
+    s3_client.put_object(Bucket=bucket, Key="data.csv", Body=b"a;b\n1;x\n2;y\n3;z\n")
+
+    frame = s3.scan_s3_object(
+        bucket,
+        "data.csv",
+        columns=["a"],
+        s3_client=s3_client,
+        use_cache=use_cache,
+        separator=";",
+        n_rows=2,
+    )
+    assert isinstance(frame, pl.LazyFrame)
+    assert frame.collect()["a"].to_list() == [1, 2]
+
+    with pytest.raises(TypeError, match="batch_size"):
+        s3.scan_s3_object(
+            bucket, "data.csv", s3_client=s3_client, use_cache=use_cache, batch_size=10
+        )
@@ -0,0 +1,37 @@
+import os
+
+from shared.cache import FileCache
+
+
+def _age(path: str, seconds: int):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_get_keeps_linked_file_times(tmp_path):
+    cache = FileCache(str(tmp_path / "cache"), 10**6)
+    path = cache.put_bytes("bucket", "key", "etag", b"data")
+    dest = str(tmp_path / "output")
+    cache.link(path, dest)
+    _age(dest, 3600)
+    before = os.stat(dest)
+
+    assert cache.get("bucket", "key", "etag") == path
+    after = os.stat(dest)
+    assert (after.st_mtime, after.st_atime) == (before.st_mtime, before.st_atime)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FileCache(str(tmp_path / "cache"), 25)
+    first = cache.put_bytes("bucket", "first", "etag", b"x" * 10)
+    second = cache.put_bytes("bucket", "second", "etag", b"x" * 10)
+    _age(f"{first}.used", 7200)
+    _age(f"{second}.used", 3600)
+    # the first file is older, but used more recently
+    cache.get("bucket", "first", "etag")
+
+    third = cache.put_bytes("bucket", "third", "etag", b"x" * 10)
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second) and not os.path.exists(f"{second}.used")
+    assert cache.evictions == 1
+    assert cache.get("bucket", "second", "etag") is None
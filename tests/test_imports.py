@@ -0,0 +1,11 @@
+from shared.config.benchmark import check_imports
+
+
+def test_imports_are_lazy():
+    result = check_imports()
+    assert result["loaded"] == []
+    assert result["created"] == []
+
+
+def test_heavy_imports_are_detected():
+    assert check_imports(["polars"])["loaded"] == ["polars"]
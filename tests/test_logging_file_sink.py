@@ -0,0 +1,36 @@
+import logging
+import time
+
+from shared.logging.file_sink import create_file_sink
+
+
+def _record(msg: str):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None)
+
+
+def test_flushes_after_interval_without_more_records(tmp_path):
+    handler = create_file_sink(
+        str(tmp_path), flush_interval=0.1, formatter=logging.Formatter()
+    )
+    try:
+        handler.handle(_record("first"))
+        path = tmp_path / "app.log"
+        assert not path.exists() or path.read_text() == ""
+
+        deadline = time.monotonic() + 5
+        while not (path.exists() and "first" in path.read_text()):
+            assert time.monotonic() < deadline, "the buffered record wasn't written"
+            time.sleep(0.05)
+    finally:
+        handler.close()
+
+    assert not handler._flush_thread.is_alive()
+
+
+def test_close_writes_buffered_records(tmp_path):
+    handler = create_file_sink(
+        str(tmp_path), flush_interval=60, formatter=logging.Formatter()
+    )
+    handler.handle(_record("first"))
+    handler.close()
+    assert (tmp_path / "app.log").read_text() == "first\n"
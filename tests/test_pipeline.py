@@ -0,0 +1,26 @@
+from shared.pipeline import TItemResult, _Progress
+
+
+def _result(success: bool = True):
+    return TItemResult(id="item", success=success, result=None, error="")
+
+
+def test_progress_excludes_resumed_items_from_rate():
+    progress = _Progress("pipeline", 10, interval=3600)
+    for _ in range(4):
+        progress.skip()
+    progress.update([_result(), _result(False)])
+    # 2 items processed in 2 seconds
+    progress._last_log = progress._start + 2
+
+    assert progress.format() == (
+        "pipeline :: 6/10 items (4 resumed, 1 failed) - 1.0 items/s, ~4s left"
+    )
+
+
+def test_progress_without_total():
+    progress = _Progress("pipeline", None, interval=3600)
+    progress.update([_result()])
+    progress._last_log = progress._start + 1
+
+    assert progress.format() == "pipeline :: 1 items (0 failed) - 1.0 items/s"
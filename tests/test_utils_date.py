@@ -0,0 +1,149 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from shared.utils.date import working_hours_difference, working_hours_differences
+
+HOLIDAYS = [
+    date(2023, 12, 25),
+    date(2023, 12, 26),
+    date(2024, 1, 1),
+    date(2024, 3, 29),
+    date(2024, 4, 1),
+    date(2024, 5, 6),
+    date(2024, 8, 26),
+    date(2024, 12, 25),
+    date(2024, 12, 26),
+    date(2025, 1, 1),
+]
+
+
+def _working_hours_difference_loop(
+    start_date: datetime,
+    end_date: datetime,
+    working_hour_start=9,
+    working_hour_end=17,
+    holidays=(),
+) -> float:
+    # the day-by-day loop `working_hours_difference` replaced, plus the holidays check
+    work_start_time = datetime.time(datetime(2000, 1, 1, working_hour_start))
+    work_end_time = datetime.time(datetime(2000, 1, 1, working_hour_end))
+    work_hours_per_day = abs(working_hour_end - working_hour_start)
+    total_hours = 0
+    current_date = start_date
+
+    while current_date.date() <= end_date.date():
+        if current_date.weekday() < 5 and current_date.date() not in holidays:
+            if current_date.date() == start_date.date():
+                work_end_today = datetime(
+                    current_date.year,
+                    current_date.month,
+                    current_date.day,
+                    work_end_time.hour,
+                )
+                if current_date.time() > work_end_time:
+                    pass
+                elif current_date.time() <= work_start_time:
+                    total_hours += work_hours_per_day
+                else:
+                    total_hours += (work_end_today - current_date).seconds / 3600
+            elif current_date.date() == end_date.date():
+                work_start_today = datetime(
+                    current_date.year,
+                    current_date.month,
+                    current_date.day,
+                    work_start_time.hour,
+                )
+                if end_date.time() < work_start_time:
+                    pass
+                elif end_date.time() >= work_end_time:
+                    total_hours += work_hours_per_day
+                else:
+                    total_hours += (end_date - work_start_today).seconds / 3600.0
+            else:
+                total_hours += work_hours_per_day
+        current_date += timedelta(days=1)
+
+    return total_hours
+
+
+def _random_datetime(rng: random.Random) -> datetime:
+    day = datetime(2023, 12, 18) + timedelta(days=rng.randrange(400))
+    if rng.random() < 0.3:
+        # on (or either side of) an hour, to hit the boundaries of the working day
+        return day + timedelta(hours=rng.randrange(24), seconds=rng.choice([-1, 0, 1]))
+    return day + timedelta(
+        seconds=rng.randrange(24 * 3600), microseconds=rng.randrange(10**6)
+    )
+
+
+def _random_pairs(n: int, seed: int = 0) -> list[tuple[datetime, datetime]]:
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(n):
+        start = _random_datetime(rng)
+        kind = rng.random()
+        if kind < 0.2:
+            # the same day
+            end = start.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(
+                seconds=rng.randrange(24 * 3600)
+            )
+        elif kind < 0.4:
+            # within a couple of weeks
+            end = start + timedelta(seconds=rng.randrange(14 * 24 * 3600))
+        else:
+            end = _random_datetime(rng)  # reversed about half of the time
+        pairs.append((start, end))
+    return pairs
+
+
+@pytest.mark.parametrize("working_hours", [(9, 17), (8, 18), (0, 23)])
+@pytest.mark.parametrize("holidays", [(), HOLIDAYS], ids=["no holidays", "holidays"])
+def test_working_hours_difference_matches_loop(working_hours, holidays):
+    for start, end in _random_pairs(2000):
+        expected = _working_hours_difference_loop(start, end, *working_hours, holidays)
+        actual = working_hours_difference(start, end, *working_hours, holidays)
+        assert actual == pytest.approx(expected), (start, end)
+
+
+@pytest.mark.parametrize("working_hours", [(9, 17), (8, 18), (0, 23)])
+@pytest.mark.parametrize("holidays", [(), HOLIDAYS], ids=["no holidays", "holidays"])
+def test_working_hours_differences_matches_loop(working_hours, holidays):
+    pairs = _random_pairs(2000, seed=1)
+    expected = [
+        _working_hours_difference_loop(start, end, *working_hours, holidays)
+        for start, end in pairs
+    ]
+    starts, ends = zip(*pairs)
+    actual = working_hours_differences(
+        list(starts), list(ends), *working_hours, holidays
+    )
+    np.testing.assert_allclose(actual, expected)
+
+
+def test_working_hours_differences_inputs():
+    pl = pytest.importorskip("polars")
+    pairs = _random_pairs(100, seed=2)
+    expected = [
+        _working_hours_difference_loop(start, end, holidays=HOLIDAYS)
+        for start, end in pairs
+    ]
+    starts, ends = zip(*pairs)
+
+    actual = working_hours_differences(
+        np.array(starts, dtype="datetime64[us]"),
+        np.array(ends, dtype="datetime64[us]"),
+        holidays=HOLIDAYS,
+    )
+    np.testing.assert_allclose(actual, expected)
+
+    actual = working_hours_differences(
+        pl.Series("start", starts + (None,)),
+        pl.Series("end", ends + (ends[0],)),
+        holidays=HOLIDAYS,
+    )
+    assert actual.name == "start"
+    assert actual[-1] is None
+    np.testing.assert_allclose(actual[:-1].to_numpy(), expected)
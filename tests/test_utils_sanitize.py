@@ -0,0 +1,44 @@
+import pytest
+
+from shared.utils.sanitize import (
+    _INVALID_CHARACTERS,
+    _INVALID_FILENAME_CHARACTERS,
+    _sanitize,
+    sanitize_expr,
+)
+
+VALUES = [
+    "",
+    "valid.txt",
+    'a:b*c?d"e<f>g|h',
+    "tabs\tand\nnew\rlines\x0b\x0c",
+    "folder/sub\\file.csv",
+    "trailing dots... ",
+    " . ",
+    "price $1 & $$ ${0}",
+    "ünïcödé: ✅ 🚀|",
+    "ab" * 200,
+    "é" * 254 + ". x",
+    "x" * 250 + ":::::" + "....",
+]
+
+
+@pytest.mark.parametrize(
+    "replacement_text", ["_", "", "-", "$1", "$", "ab", "xb", ":", "::", "\\\\", "é"]
+)
+@pytest.mark.parametrize(
+    "invalid_characters",
+    [_INVALID_CHARACTERS, _INVALID_FILENAME_CHARACTERS, "b", ":b", "$.", ""],
+)
+def test_sanitize_expr_matches_sanitize(replacement_text, invalid_characters):
+    pl = pytest.importorskip("polars")
+    expected = [_sanitize(v, replacement_text, invalid_characters) for v in VALUES]
+    actual = sanitize_expr(
+        pl.Series(VALUES), replacement_text, invalid_characters
+    ).to_list()
+    assert actual == expected
+
+
+def test_sanitize_replaces_each_character_once():
+    # replacing `:` & then `b` one after the other would give `axxbc`
+    assert _sanitize("a:c", "xb", ":b") == "axbc"